@@ -1,3 +1,4 @@
+import logging
 from flask import Flask, jsonify, request
 
 def create_app():
@@ -8,6 +9,16 @@ def create_app():
     import os
     app.config['SECRET_KEY'] = os.urandom(24)
     
+    # Optional warm-up: load the SDK and build the model clients now, so that with
+    # gunicorn's --preload the forked workers share them. Otherwise they are loaded
+    # on the first request, which keeps startup fast.
+    from app.config import settings
+    if settings.LLM_BACKEND == 'gemini' and not settings.GEMINI_API_KEY:
+        logging.warning("Warning: GEMINI_API_KEY environment variable not set.")
+    if settings.WARMUP_ON_START:
+        from app.services.llm_backends import get_backend
+        get_backend().warm_up([settings.GEMINI_MODEL] + settings.FALLBACK_MODELS)
+    
     # Register blueprints
     from app.routes import main
     app.register_blueprint(main)
@@ -41,7 +52,7 @@ def create_app():
         """Check if the request is expecting a JSON response."""
         best = request.accept_mimetypes.best_match(['application/json', 'text/html'])
         return (best == 'application/json' or 
-                (request.path and request.path.startswith('/analyze')) or
+                (request.path and request.path.startswith(('/analyze', '/jobs'))) or
                 request.headers.get('Content-Type') == 'application/json')
     
     return app 
\ No newline at end of file
@@ -0,0 +1,237 @@
+"""
+ASGI entry point: an async /analyze and the /live WebSocket in front of the Flask app.
+
+POST /analyze is handled natively with analyze_transcript_async, so each
+in-flight analysis is a coroutine rather than a pinned OS thread and one
+process can wait on hundreds of upstream calls. Every other route, including
+/analyze?mode=async jobs, streaming and batches, is served by the unchanged
+Flask app through asgiref's WSGI adapter, on a pool of WSGI_FALLBACK_THREADS
+threads so a long stream or batch does not hold up the others.
+
+/live analyses a call while it happens; see LiveSession for the protocol
+and live_endpoint for the messages.
+
+Run with:
+    gunicorn app.asgi:app -k uvicorn.workers.UvicornWorker --workers 1 --timeout 600 --preload
+"""
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+from app import create_app
+from app.config import settings
+from app.services.batch_service import validate_record
+from app.services.deadline import Deadline
+from app.services.gemini_service import analyze_transcript_async
+from app.services.live_session import LiveSession, LiveSessionError, analyse_segments
+from app.services.metrics import STAGE_SECONDS, IN_FLIGHT, LIVE_SESSIONS
+
+MAX_BODY_BYTES = 5 * 1024 * 1024  # Same limit as the Flask route
+
+_wsgi_executor = ThreadPoolExecutor(max_workers=max(1, settings.WSGI_FALLBACK_THREADS), thread_name_prefix='wsgi')
+
+class ThreadPoolWsgiInstance(WsgiToAsgiInstance):
+    # asgiref runs every WSGI request on one shared thread (thread_sensitive=True),
+    # which serialises the Flask routes; run each on its own pool thread instead
+    run_wsgi_app = sync_to_async(vars(WsgiToAsgiInstance)['run_wsgi_app'].func, thread_sensitive=False,
+                                 executor=_wsgi_executor)
+
+class ThreadPoolWsgiToAsgi(WsgiToAsgi):
+    """WsgiToAsgi that serves requests concurrently on _wsgi_executor."""
+
+    async def __call__(self, scope, receive, send):
+        await ThreadPoolWsgiInstance(self.wsgi_application)(scope, receive, send)
+
+flask_app = create_app()
+wsgi_app = ThreadPoolWsgiToAsgi(flask_app)
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+    elif (scope['type'] == 'http' and scope['path'] == '/analyze' and scope['method'] == 'POST'
+          and parse_qs(scope.get('query_string', b'').decode('latin-1')).get('mode') != ['async']):
+        await analyze_endpoint(scope, receive, send)
+    elif scope['type'] == 'websocket' and scope['path'] == '/live':
+        await live_endpoint(receive, send)
+    else:
+        await wsgi_app(scope, receive, send)
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def send_json(send, payload, status=200, headers=None):
+    body = (json.dumps(payload, sort_keys=True, separators=(',', ':')) + '\n').encode('utf-8')
+    response_headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    response_headers.extend((name.encode('latin-1'), value.encode('latin-1')) for name, value in (headers or {}).items())
+    await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+async def read_body(receive, limit):
+    """Read the request body. Returns None if it is larger than limit bytes or the client went away."""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > limit:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+async def cancel_on_disconnect(receive, deadline):
+    """Cancel the analysis if the client disconnects, so its upstream call is abandoned."""
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            logging.info("Client disconnected, cancelling analysis")
+            deadline.cancel()
+            return
+
+async def analyze_endpoint(scope, receive, send):
+    """Async equivalent of the Flask /analyze route (without job mode), with the same responses."""
+    with STAGE_SECONDS.labels(stage='parse').time():
+        headers = dict(scope['headers'])
+        content_type = headers.get(b'content-type', b'').decode('latin-1').split(';')[0].strip()
+        if content_type != 'application/json' and not content_type.endswith('+json'):
+            logging.warning("Non-JSON content received")
+            return await send_json(send, {'error': 'Request must be JSON. Check content-type header.'}, 400)
+
+        body = await read_body(receive, MAX_BODY_BYTES)
+        if body is None:
+            return await send_json(send, {'error': 'Request too large. Please limit transcript size.'}, 413)
+
+        try:
+            data = json.loads(body)
+        except ValueError as e:
+            logging.error(f"JSON decode error: {e}")
+            return await send_json(send, {'error': 'Invalid JSON format.'}, 400)
+        if not data:
+            return await send_json(send, {'error': 'Invalid JSON data received.'}, 400)
+
+        error = validate_record(data)
+        if error:
+            return await send_json(send, {'error': error}, 413 if 'too large' in error else 400)
+
+    # One time budget for the whole analysis, including retries and fallbacks
+    deadline = Deadline(settings.ANALYSIS_TIMEOUT_SECONDS)
+    watcher = asyncio.ensure_future(cancel_on_disconnect(receive, deadline))
+    try:
+        with IN_FLIGHT.track_inprogress():
+            result = await analyze_transcript_async(data['transcript'], data['sales_rep_names'],
+                                                    data.get('merchant_names', 'Customer'), deadline=deadline)
+    finally:
+        watcher.cancel()
+
+    # Upstream circuit breaker is open: tell the client when to come back
+    if 'retry_after' in result:
+        return await send_json(send, result, 503, {'Retry-After': str(result['retry_after'])})
+
+    with STAGE_SECONDS.labels(stage='response').time():
+        await send_json(send, result)
+
+async def live_endpoint(receive, send):
+    """
+    Live-call analysis over a WebSocket, one call per connection. JSON text messages:
+
+    Client:
+        {"type": "start", "sales_rep_names": ..., "merchant_names": ...}  first message
+        {"type": "lines", "text": ...}  transcript lines as they are spoken
+        {"type": "flush"}  analyse what has been received so far, e.g. during a pause
+        {"type": "end"}  the call is over
+
+    Server:
+        {"type": "started"}
+        {"type": "feedback", "segment": n, "feedback": ..., "model": ..., "attempt": ...}
+        {"type": "report", ...}  the final /analyze-shaped result; the socket is then closed.
+                                 Sentinel replies and errors that end the call early are
+                                 also sent as a report.
+        {"type": "error", "error": ...}  a bad message; the session carries on
+    """
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    await send({'type': 'websocket.accept'})
+
+    send_lock = asyncio.Lock()
+
+    async def send_event(payload):
+        async with send_lock:
+            await send({'type': 'websocket.send', 'text': json.dumps(payload, sort_keys=True, separators=(',', ':'))})
+
+    async def finish(result):
+        await send_event(dict(result, type='report'))
+        await send({'type': 'websocket.close', 'code': 1000})
+
+    session = None
+    segments = asyncio.Queue()
+    analyser = None
+    receiver = None
+    try:
+        with LIVE_SESSIONS.track_inprogress():
+            while True:
+                # Wait for the next client message, or for the analyser to end the session early
+                receiver = asyncio.ensure_future(receive())
+                waiting = {receiver} | ({analyser} if analyser else set())
+                await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                if analyser and analyser.done() and analyser.result() is not None:
+                    return await finish(analyser.result())
+                message = await receiver
+                receiver = None
+                if message['type'] == 'websocket.disconnect':
+                    logging.info("Live client disconnected, abandoning session")
+                    return
+
+                try:
+                    data = json.loads(message.get('text') or message.get('bytes') or b'')
+                except ValueError:
+                    await send_event({'type': 'error', 'error': 'Invalid JSON format.'})
+                    continue
+                kind = data.get('type') if isinstance(data, dict) else None
+
+                if session is None:
+                    if kind != 'start':
+                        await send_event({'type': 'error', 'error': 'Start the session first.'})
+                    elif not data.get('sales_rep_names'):
+                        await send_event({'type': 'error', 'error': 'Sales Rep name(s) not provided.'})
+                    else:
+                        session = LiveSession(data['sales_rep_names'], data.get('merchant_names', 'Customer'))
+                        analyser = asyncio.ensure_future(analyse_segments(session, segments, send_event))
+                        await send_event({'type': 'started'})
+                elif kind == 'lines':
+                    if not isinstance(data.get('text'), str):
+                        await send_event({'type': 'error', 'error': 'No transcript provided.'})
+                        continue
+                    try:
+                        for segment in session.add_lines(data['text']):
+                            segments.put_nowait(segment)
+                    except LiveSessionError as e:
+                        return await finish({'error': str(e)})
+                elif kind in ('flush', 'end'):
+                    segment = session.flush()
+                    if segment:
+                        segments.put_nowait(segment)
+                    if kind == 'end':
+                        segments.put_nowait(None)
+                        result = await analyser
+                        return await finish(result or await session.final_report())
+                else:
+                    await send_event({'type': 'error', 'error': f'Unknown message type: {kind}'})
+    finally:
+        for task in (receiver, analyser):
+            if task and not task.done():
+                task.cancel()
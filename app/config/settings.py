@@ -1,4 +1,78 @@
 import os
 
-# API Keys
-GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "") 
\ No newline at end of file
+# API Keys (the only place the key is read; the SDK is configured from here when first loaded)
+GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "")
+
+# Startup: load the SDK and build model clients in create_app instead of on the first request.
+# Worth enabling with several preloaded gunicorn workers, which then share those pages.
+WARMUP_ON_START = os.environ.get("WARMUP_ON_START", "false").lower() in ("true", "1", "yes")
+
+# Async job mode (POST /analyze?mode=async)
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))  # Concurrent analyses per process
+JOB_QUEUE_DEPTH = int(os.environ.get("JOB_QUEUE_DEPTH", "16"))  # Jobs allowed to wait for a worker
+JOB_RESULT_TTL = int(os.environ.get("JOB_RESULT_TTL", "900"))  # Seconds a finished job stays pollable
+
+# Analysis result cache
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "256"))  # In-memory LRU size; 0 disables it
+CACHE_DB_PATH = os.environ.get("CACHE_DB_PATH", "")  # SQLite file for the disk tier; empty disables it
+CACHE_TTL_SECONDS = int(os.environ.get("CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Long transcripts: analyse in parallel chunks and merge, instead of truncating
+LONG_TRANSCRIPT_MODE = os.environ.get("LONG_TRANSCRIPT_MODE", "true").lower() in ("1", "true", "yes")
+LONG_TRANSCRIPT_CHUNK_SIZE = int(os.environ.get("LONG_TRANSCRIPT_CHUNK_SIZE", "20000"))  # Characters per chunk
+LONG_TRANSCRIPT_PARALLELISM = int(os.environ.get("LONG_TRANSCRIPT_PARALLELISM", "5"))  # Chunks analysed at once
+
+# Time budget for one analysis, shared by the first attempt, retries and fallbacks
+ANALYSIS_TIMEOUT_SECONDS = int(os.environ.get("ANALYSIS_TIMEOUT_SECONDS", "300"))
+
+# Gemini model and static prompt prefix caching
+GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-2.5-flash-preview-05-20")
+PROMPT_CACHE_ENABLED = os.environ.get("PROMPT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+PROMPT_CACHE_TTL_SECONDS = int(os.environ.get("PROMPT_CACHE_TTL_SECONDS", "3600"))
+
+# ASGI server: threads running the Flask routes it does not serve natively (streams, batches, jobs, UI)
+WSGI_FALLBACK_THREADS = int(os.environ.get("WSGI_FALLBACK_THREADS", "16"))
+
+# Batch scoring (POST /analyze/batch)
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "4"))  # Records analysed at once per batch
+
+# LLM backend: "gemini" for the real API, "stub" for the offline stub used in benchmarks and CI
+LLM_BACKEND = os.environ.get("LLM_BACKEND", "gemini").lower()
+STUB_LATENCY = os.environ.get("STUB_LATENCY", "lognormal:-0.7,0.5")  # fixed:S | uniform:LO,HI | lognormal:MU,SIGMA
+STUB_ERROR_RATE = float(os.environ.get("STUB_ERROR_RATE", "0"))  # Fraction of calls that raise an upstream error
+STUB_SENTINEL_RATE = float(os.environ.get("STUB_SENTINEL_RATE", "0"))  # Fraction of calls answered with a sentinel
+STUB_PREFIX_CACHE = os.environ.get("STUB_PREFIX_CACHE", "false").lower() in ("1", "true", "yes")  # Emulate an SDK with cached content
+STUB_STREAM_CHUNKS = int(os.environ.get("STUB_STREAM_CHUNKS", "20"))
+STUB_SEED = os.environ.get("STUB_SEED")  # Set for reproducible latency and error sequences
+
+# Memory policy: when to force a garbage collection after an analysis
+GC_POLICY = os.environ.get("GC_POLICY", "rss").lower()  # none | per_request | rss
+GC_RSS_THRESHOLD_MB = int(os.environ.get("GC_RSS_THRESHOLD_MB", "400"))  # Used by the "rss" policy
+
+# Upstream call policy: retries, rate limiting and circuit breaker
+UPSTREAM_MAX_ATTEMPTS = int(os.environ.get("UPSTREAM_MAX_ATTEMPTS", "3"))  # First call plus retries
+UPSTREAM_BACKOFF_BASE = float(os.environ.get("UPSTREAM_BACKOFF_BASE", "1.0"))  # Seconds; doubles per retry, with full jitter
+UPSTREAM_BACKOFF_MAX = float(os.environ.get("UPSTREAM_BACKOFF_MAX", "20"))
+UPSTREAM_RATE_PER_MINUTE = float(os.environ.get("UPSTREAM_RATE_PER_MINUTE", "60"))  # Match the API quota; 0 disables
+UPSTREAM_BURST = int(os.environ.get("UPSTREAM_BURST", "5"))
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("BREAKER_FAILURE_THRESHOLD", "5"))  # Consecutive retryable failures
+BREAKER_RESET_SECONDS = float(os.environ.get("BREAKER_RESET_SECONDS", "30"))  # Time open before a trial call
+
+# Local pre-check that answers speaker-role, redaction and unsupported-input failures without an API call
+PRECHECK_ENABLED = os.environ.get("PRECHECK_ENABLED", "true").lower() in ("true", "1", "yes")
+
+# Transcript compaction: prompt budget for the transcript itself (about 4 characters per token)
+TRANSCRIPT_TOKEN_BUDGET = int(os.environ.get("TRANSCRIPT_TOKEN_BUDGET", "7500"))
+
+# Hedged requests: duplicate a slow final call, or fall back to other models, and keep the first good answer
+HEDGE_ENABLED = os.environ.get("HEDGE_ENABLED", "false").lower() in ("true", "1", "yes")
+HEDGE_PERCENTILE = float(os.environ.get("HEDGE_PERCENTILE", "95"))  # Hedge once a call is slower than this percentile
+HEDGE_MIN_DELAY_SECONDS = float(os.environ.get("HEDGE_MIN_DELAY_SECONDS", "10"))
+HEDGE_INITIAL_DELAY_SECONDS = float(os.environ.get("HEDGE_INITIAL_DELAY_SECONDS", "60"))  # Until enough latencies are recorded
+HEDGE_MIN_SAMPLES = int(os.environ.get("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MAX_ATTEMPTS = int(os.environ.get("HEDGE_MAX_ATTEMPTS", "2"))  # Attempts on the primary model when FALLBACK_MODELS is empty
+FALLBACK_MODELS = [name.strip() for name in os.environ.get("FALLBACK_MODELS", "").split(",") if name.strip()]  # e.g. "gemini-1.5-flash"
+
+# Live-call sessions (WebSocket /live, ASGI server only)
+LIVE_SEGMENT_CHARS = int(os.environ.get("LIVE_SEGMENT_CHARS", "2000"))  # Finished utterances gathered before a segment is analysed
+LIVE_SEGMENT_TIMEOUT_SECONDS = int(os.environ.get("LIVE_SEGMENT_TIMEOUT_SECONDS", "60"))
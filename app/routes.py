@@ -1,15 +1,89 @@
-from flask import Blueprint, render_template, request, jsonify, current_app, make_response, Response
+from flask import Blueprint, render_template, request, jsonify, current_app, make_response, Response, url_for, stream_with_context
 import os
 import logging
 import traceback
-import gc  # Garbage collector
 import json
 
-from app.services.gemini_service import analyze_transcript
+from app.config import settings
+from app.services.batch_service import iter_batch_results
+from app.services.deadline import Deadline
+from app.services.gemini_service import analyze_transcript, stream_analysis
+from app.services.job_queue import get_job_manager, job_mode_available, JobQueueFull
+from app.services.metrics import STAGE_SECONDS, IN_FLIGHT, render_metrics
+from app.services.result_cache import get_result_cache
 
 # Create blueprint
 main = Blueprint('main', __name__)
 
+# Content types accepted for line-delimited batch uploads
+JSONL_MIMETYPES = ('application/x-ndjson', 'application/jsonl', 'application/x-jsonlines', 'application/json-seq')
+
+def parse_analysis_request():
+    """
+    Validates an /analyze request body.
+
+    Returns:
+        tuple: (params, None) with the analyze_transcript arguments on success,
+               or (None, response) with the error response to send back.
+    """
+    # Check content type to ensure JSON
+    if not request.is_json:
+        logging.warning("Non-JSON content received")
+        return None, make_response(jsonify({'error': 'Request must be JSON. Check content-type header.'}), 400)
+
+    # Limit request size to avoid memory issues
+    content_length = request.content_length
+    if content_length and content_length > 5 * 1024 * 1024:  # 5MB limit
+        return None, make_response(jsonify({'error': 'Request too large. Please limit transcript size.'}), 413)
+
+    try:
+        data = request.get_json()
+    except json.JSONDecodeError as e:
+        logging.error(f"JSON decode error: {e}")
+        return None, make_response(jsonify({'error': 'Invalid JSON format.'}), 400)
+
+    if not data:
+        return None, make_response(jsonify({'error': 'Invalid JSON data received.'}), 400)
+
+    transcript = data.get('transcript')
+    sales_rep_names = data.get('sales_rep_names')
+    merchant_names = data.get('merchant_names', 'Customer')  # Default to 'Customer' if not provided
+
+    if not transcript:
+        return None, make_response(jsonify({'error': 'No transcript provided.'}), 400)
+    if not sales_rep_names:
+        return None, make_response(jsonify({'error': 'Sales Rep name(s) not provided.'}), 400)
+
+    # Limit transcript size to avoid memory issues
+    if len(transcript) > 100000:  # Approximately 100KB
+        return None, make_response(jsonify({'error': 'Transcript too large. Please use a shorter transcript.'}), 413)
+
+    return {
+        'transcript': transcript,
+        'sales_rep_names': sales_rep_names,
+        'merchant_names': merchant_names,
+    }, None
+
+def iter_jsonl_records(stream):
+    """
+    Reads batch records from a JSONL byte stream one line at a time.
+
+    Yields:
+        tuple: (index, record) for each non-blank line; record is a ValueError
+               when the line is not valid JSON, so that one record fails alone
+    """
+    index = 0
+    for line_number, line in enumerate(iter(stream.readline, b''), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            record = ValueError(f'Invalid JSON on line {line_number}: {e}')
+        yield index, record
+        index += 1
+
 @main.route('/')
 def index():
     """Serves the main HTML page."""
@@ -20,56 +94,139 @@ def analyze_transcript_route():
     """Receives transcript data and speaker roles, calls Gemini API."""
     if request.method == 'POST':
         try:
-            # Check content type to ensure JSON
-            if not request.is_json:
-                logging.warning("Non-JSON content received")
-                return make_response(jsonify({'error': 'Request must be JSON. Check content-type header.'}), 400)
-
-            # Limit request size to avoid memory issues
-            content_length = request.content_length
-            if content_length and content_length > 5 * 1024 * 1024:  # 5MB limit
-                return make_response(jsonify({'error': 'Request too large. Please limit transcript size.'}), 413)
-
-            try:
-                data = request.get_json()
-            except json.JSONDecodeError as e:
-                logging.error(f"JSON decode error: {e}")
-                return make_response(jsonify({'error': 'Invalid JSON format.'}), 400)
-                
-            if not data:
-                return make_response(jsonify({'error': 'Invalid JSON data received.'}), 400)
-                
-            transcript = data.get('transcript')
-            sales_rep_names = data.get('sales_rep_names')
-            merchant_names = data.get('merchant_names', 'Customer')  # Default to 'Customer' if not provided
-
-            if not transcript:
-                return make_response(jsonify({'error': 'No transcript provided.'}), 400)
-            if not sales_rep_names:
-                return make_response(jsonify({'error': 'Sales Rep name(s) not provided.'}), 400)
-
-            # Limit transcript size to avoid memory issues
-            if len(transcript) > 100000:  # Approximately 100KB
-                return make_response(jsonify({'error': 'Transcript too large. Please use a shorter transcript.'}), 413)
+            with STAGE_SECONDS.labels(stage='parse').time():
+                params, error_response = parse_analysis_request()
+            if error_response:
+                return error_response
+
+            # One time budget for the whole analysis, including retries and fallbacks
+            deadline = Deadline(settings.ANALYSIS_TIMEOUT_SECONDS)
+
+            # Job mode: queue the analysis and return immediately
+            if request.args.get('mode') == 'async':
+                if not job_mode_available():
+                    return make_response(jsonify({'error': 'Async job mode needs a single worker process. Use /analyze or /analyze/stream instead.'}), 501)
+                try:
+                    # The budget starts when a worker runs the job, not while it is queued
+                    job_id = get_job_manager().submit(analyze_transcript, deadline=deadline,
+                                                      on_cancel=deadline.cancel, on_start=deadline.restart,
+                                                      **params)
+                except JobQueueFull as e:
+                    logging.warning(f"Rejecting async analysis: {e}")
+                    return make_response(jsonify({'error': 'Too many analyses in progress. Please try again shortly.'}), 503)
+                status_url = url_for('main.job_status_route', job_id=job_id)
+                response = make_response(jsonify({'job_id': job_id, 'status': 'queued', 'status_url': status_url}), 202)
+                response.headers['Location'] = status_url
+                return response
 
             # Call the analysis service
-            response = analyze_transcript(transcript, sales_rep_names, merchant_names)
-            
-            # Force garbage collection to free memory
-            gc.collect()
+            with IN_FLIGHT.track_inprogress():
+                response = analyze_transcript(deadline=deadline, **params)
             
+            # Upstream circuit breaker is open: tell the client when to come back
+            if 'retry_after' in response:
+                http_response = make_response(jsonify(response), 503)
+                http_response.headers['Retry-After'] = str(response['retry_after'])
+                return http_response
+
             # Always return a proper JSON response
-            return make_response(jsonify(response))
+            with STAGE_SECONDS.labels(stage='response').time():
+                return make_response(jsonify(response))
 
         except Exception as e:
             # Log the full stack trace for debugging
             logging.error(f"Error processing request: {e}")
             logging.error(traceback.format_exc())
             
-            # Clean up memory
-            gc.collect()
-            
             # Check if it's a Google API error for more specific feedback
             if hasattr(e, 'args') and e.args and isinstance(e.args[0], str) and "API key not valid" in e.args[0]:
                  return make_response(jsonify({'error': 'Invalid Gemini API Key. Please check your configuration.'}), 500)
-            return make_response(jsonify({'error': f'An error occurred processing your request: {str(e)}'}), 500) 
\ No newline at end of file
+            return make_response(jsonify({'error': f'An error occurred processing your request: {str(e)}'}), 500)
+
+@main.route('/analyze/stream', methods=['POST'])
+def analyze_stream_route():
+    """Streams the Gemini analysis back to the client as Server-Sent Events."""
+    with STAGE_SECONDS.labels(stage='parse').time():
+        params, error_response = parse_analysis_request()
+    if error_response:
+        return error_response
+
+    deadline = Deadline(settings.ANALYSIS_TIMEOUT_SECONDS)
+
+    def generate():
+        with IN_FLIGHT.track_inprogress():
+            for event, data in stream_analysis(deadline=deadline, **params):
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Stop proxies from buffering the stream
+    return response
+
+@main.route('/analyze/batch', methods=['POST'])
+def analyze_batch_route():
+    """
+    Scores many transcripts at once, streaming per-record results back as NDJSON.
+
+    Accepts a JSON array of {transcript, sales_rep_names, merchant_names} records,
+    a JSONL request body, or a JSONL file uploaded as the multipart field "file".
+    JSONL input is read line by line as slots free up, so large batches never
+    sit in memory whole.
+    """
+    if request.mimetype in JSONL_MIMETYPES:
+        records = iter_jsonl_records(request.stream)
+    elif request.mimetype == 'multipart/form-data':
+        upload = request.files.get('file')
+        if not upload:
+            return make_response(jsonify({'error': 'Upload a JSONL file in the "file" field.'}), 400)
+        records = iter_jsonl_records(upload.stream)
+    elif request.is_json:
+        # A JSON array has to be parsed whole, so it gets the same size limit as /analyze
+        content_length = request.content_length
+        if content_length and content_length > 5 * 1024 * 1024:  # 5MB limit
+            return make_response(jsonify({'error': 'Request too large. Upload larger batches as a JSONL file.'}), 413)
+        data = request.get_json(silent=True)
+        if not isinstance(data, list):
+            return make_response(jsonify({'error': 'Request must be a JSON array of records.'}), 400)
+        records = enumerate(data)
+    else:
+        return make_response(jsonify({'error': 'Send a JSON array, a JSONL body or a JSONL file upload.'}), 400)
+
+    # Clients may ask for less concurrency than the configured cap, never more
+    concurrency = min(request.args.get('concurrency', settings.BATCH_CONCURRENCY, type=int), settings.BATCH_CONCURRENCY)
+
+    def generate():
+        with IN_FLIGHT.track_inprogress():
+            for result in iter_batch_results(records, concurrency):
+                yield json.dumps(result) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@main.route('/metrics', methods=['GET'])
+def metrics_route():
+    """Exposes Prometheus metrics: per-stage latency, retries, timeouts, tokens and memory."""
+    body, content_type = render_metrics()
+    response = Response(body)
+    response.headers['Content-Type'] = content_type
+    return response
+
+@main.route('/cache/stats', methods=['GET'])
+def cache_stats_route():
+    """Reports analysis cache hit/miss counters and the upstream time they saved."""
+    return make_response(jsonify(get_result_cache().stats()))
+
+@main.route('/jobs/<job_id>', methods=['GET'])
+def job_status_route(job_id):
+    """Returns the status, and once finished the result, of an async analysis job."""
+    job = get_job_manager().get(job_id)
+    if not job:
+        return make_response(jsonify({'error': 'Job not found or expired.'}), 404)
+    return make_response(jsonify(job))
+
+@main.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job_route(job_id):
+    """Cancels a queued or running analysis job."""
+    job = get_job_manager().cancel(job_id)
+    if not job:
+        return make_response(jsonify({'error': 'Job not found or expired.'}), 404)
+    return make_response(jsonify(job))
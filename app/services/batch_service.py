@@ -0,0 +1,99 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from app.config import settings
+from app.services.deadline import Deadline
+from app.services.gemini_service import analyze_transcript
+
+MAX_TRANSCRIPT_LENGTH = 100000  # Same limit as /analyze
+
+def validate_record(record):
+    """
+    Checks one batch record.
+
+    Returns:
+        str: An error message, or None if the record can be analysed
+    """
+    if isinstance(record, Exception):
+        return str(record)
+    if not isinstance(record, dict):
+        return 'Record must be a JSON object.'
+    transcript = record.get('transcript')
+    if not transcript or not isinstance(transcript, str):
+        return 'No transcript provided.'
+    if not record.get('sales_rep_names'):
+        return 'Sales Rep name(s) not provided.'
+    if len(transcript) > MAX_TRANSCRIPT_LENGTH:
+        return 'Transcript too large. Please use a shorter transcript.'
+    return None
+
+def iter_batch_results(records, concurrency=None):
+    """
+    Analyzes batch records concurrently, yielding each result as soon as it finishes.
+
+    Records are pulled from the iterable only when a slot is free, so no more
+    than `concurrency` records are held in memory at once however large the
+    batch is. A bad record produces an error result and never fails the batch.
+
+    Args:
+        records (iterable): (index, record) pairs; record is a dict with transcript,
+                            sales_rep_names and optional merchant_names, or an
+                            exception describing why the input could not be parsed
+        concurrency (int): Records analysed at once; defaults to BATCH_CONCURRENCY
+
+    Yields:
+        dict: {'index': ..., **result}, where result has the same shape /analyze
+              returns, followed by one final {'summary': {...}}
+    """
+    concurrency = max(1, concurrency or settings.BATCH_CONCURRENCY)
+    records = iter(records)
+    in_flight = {}
+    total = failed = 0
+    exhausted = False
+
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='batch-record')
+    try:
+        while True:
+            # Top up the in-flight set from the input
+            while not exhausted and len(in_flight) < concurrency:
+                try:
+                    index, record = next(records)
+                except StopIteration:
+                    exhausted = True
+                    break
+                total += 1
+                error = validate_record(record)
+                if error:
+                    failed += 1
+                    yield {'index': index, 'error': error}
+                    continue
+                deadline = Deadline(settings.ANALYSIS_TIMEOUT_SECONDS)
+                future = executor.submit(analyze_transcript,
+                                         record['transcript'],
+                                         record['sales_rep_names'],
+                                         record.get('merchant_names') or 'Customer',
+                                         deadline=deadline)
+                in_flight[future] = (index, deadline)
+
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, _ = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logging.error(f"Batch record {index} failed: {e}")
+                    result = {'error': f'An error occurred processing your request: {str(e)}'}
+                if 'error' in result or result.get('is_error'):
+                    failed += 1
+                yield {'index': index, **result}
+
+        yield {'summary': {'records': total, 'succeeded': total - failed, 'failed': failed}}
+    finally:
+        # The client may disconnect mid-batch; don't start records nobody will read,
+        # and abandon the upstream calls of those already running
+        executor.shutdown(wait=False, cancel_futures=True)
+        for _, deadline in in_flight.values():
+            deadline.cancel()
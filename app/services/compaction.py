@@ -0,0 +1,148 @@
+import logging
+import re
+
+from app.services.llm_backends import estimate_tokens
+from app.services.precheck import split_names, name_matches, WORD_RE
+from app.services.transcript import split_utterances, parse_speaker_line
+
+# Utterances made up only of these words (and BACKCHANNEL_PHRASES) carry no content
+FILLER_WORDS = {
+    'yeah', 'yep', 'yup', 'mm', 'mmm', 'hm', 'hmm', 'mhm', 'uh', 'huh', 'um', 'umm', 'er', 'erm',
+    'ah', 'oh', 'ok', 'okay', 'right', 'sure', 'cool', 'gotcha', 'alright', 'wow', 'nice',
+}
+BACKCHANNEL_PHRASES = re.compile(r'\b(?:got it|i see|makes sense|sounds good|fair enough|all right)\b')
+
+# Word caps tried in turn for merchant utterances while the transcript is over budget
+MONOLOGUE_WORD_CAPS = (150, 80, 40, 20)
+
+SHORTENED_MARKER = '[…]'
+
+def is_backchannel(text):
+    """True for utterances such as "Yeah.", "Mm-hm, okay" or "Got it" that carry no content."""
+    words = WORD_RE.findall(BACKCHANNEL_PHRASES.sub(' ', text.casefold()))
+    return all(word in FILLER_WORDS for word in words)
+
+def parse_utterances(transcript):
+    """
+    Parses a transcript into [speaker, text] pairs with timestamps removed.
+
+    Continuation lines are joined onto their utterance. Lines before the first
+    speaker label get a speaker of None.
+    """
+    utterances = []
+    for lines in split_utterances(transcript):
+        speaker, text = parse_speaker_line(lines[0])
+        text = ' '.join([text.strip()] + [line.strip() for line in lines[1:] if line.strip()]).strip()
+        if text:
+            utterances.append([speaker, text])
+    return utterances
+
+def render_utterances(utterances):
+    return '\n'.join(f"{speaker}: {text}" if speaker is not None else text for speaker, text in utterances)
+
+def tidy_utterances(utterances, is_merchant):
+    """
+    Removes what costs tokens without telling the model anything.
+
+    Drops backchannel utterances from merchant speakers (unless they answer a
+    question from anyone else, where "Yeah." may be a commitment) and merges
+    consecutive utterances of the same merchant speaker, so their speaker
+    prefix is not repeated. Only speakers that positively match a merchant
+    name are touched: rep utterances and speakers matching no name (e.g.
+    "Rep:" labels) are never dropped or merged, because the rubric classifies
+    each seller utterance separately.
+    """
+    tidied = []
+    for speaker, text in utterances:
+        previous = tidied[-1] if tidied else None
+        merchant = speaker is not None and is_merchant(speaker)
+        if merchant and is_backchannel(text):
+            answers_question = (previous and previous[0] is not None and not is_merchant(previous[0])
+                                and previous[1].rstrip().endswith('?'))
+            if not answers_question:
+                continue
+        if previous and merchant and previous[0] == speaker:
+            previous[1] = f"{previous[1]} {text}"
+            continue
+        tidied.append([speaker, text])
+    return tidied
+
+def shorten(text, max_words):
+    """Keeps the first and last max_words / 2 words of text, marking the cut."""
+    words = text.split()
+    if len(words) <= max_words:
+        return text
+    half = max_words // 2
+    return ' '.join(words[:half] + [SHORTENED_MARKER] + words[-half:])
+
+def drop_middle(utterances, token_budget):
+    """
+    Last resort when the utterances that cannot be shortened exceed the budget: keeps whole utterances
+    from the start and the end of the call and drops the middle. Single utterances
+    too long to fit are shortened first.
+    """
+    max_words = max(1, token_budget // 4)
+    utterances = [[speaker, shorten(speech, max_words)] for speaker, speech in utterances]
+    sizes = [estimate_tokens(render_utterances([utterance])) + 1 for utterance in utterances]
+    head, tail = 0, len(utterances)
+    used = 0
+    take_head = True
+    while head < tail:
+        index = head if take_head else tail - 1
+        if used + sizes[index] > token_budget:
+            break
+        used += sizes[index]
+        if take_head:
+            head += 1
+        else:
+            tail -= 1
+        take_head = not take_head
+    omitted = tail - head
+    if not omitted:
+        return utterances
+    return utterances[:head] + [[None, f"[… {omitted} utterances omitted for length …]"]] + utterances[tail:]
+
+def compact_transcript(transcript, sales_rep_names, merchant_names, token_budget=None):
+    """
+    Compacts a transcript for the prompt, keeping every sales-rep utterance word for word where possible.
+
+    Always strips timestamps, merchant backchannel lines and repeated merchant
+    speaker prefixes. If token_budget is given and the result is still over it,
+    long merchant monologues are shortened step by step; only if the rest does
+    not fit is the middle of the call dropped. Unlike truncation, the end of the
+    call - where Narrow/Confirm and Sweeper questions tend to be - is kept.
+
+    Only speakers that match a merchant name and no rep name are shortened,
+    merged or dropped. Speakers matching no name at all ("Rep:", or "Dan" for
+    "Daniel") are kept word for word, since any of them may be the rep.
+
+    Returns:
+        tuple: (text, shortened) - the compacted transcript, and whether any
+               content (rather than just filler) had to be removed to fit the budget
+    """
+    reps = split_names(sales_rep_names)
+    merchants = split_names(merchant_names)
+    merchant_cache = {}
+
+    def is_merchant(speaker):
+        if speaker not in merchant_cache:
+            words = tuple(WORD_RE.findall(speaker.casefold()))
+            merchant_cache[speaker] = (bool(words) and any(name_matches(name, words) for name in merchants)
+                                       and not any(name_matches(name, words) for name in reps))
+        return merchant_cache[speaker]
+
+    utterances = tidy_utterances(parse_utterances(transcript), is_merchant)
+    text = render_utterances(utterances)
+    if token_budget is None or estimate_tokens(text) <= token_budget:
+        return text, False
+
+    for max_words in MONOLOGUE_WORD_CAPS:
+        utterances = [[speaker, shorten(speech, max_words) if speaker is not None and is_merchant(speaker) else speech]
+                      for speaker, speech in utterances]
+        text = render_utterances(utterances)
+        if estimate_tokens(text) <= token_budget:
+            logging.info(f"Shortened merchant utterances to {max_words} words to fit {token_budget} tokens")
+            return text, True
+
+    logging.warning(f"Non-merchant utterances exceed the {token_budget} token budget, dropping the middle of the call")
+    return render_utterances(drop_middle(utterances, token_budget)), True
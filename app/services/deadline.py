@@ -0,0 +1,176 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+# How often waiting threads wake up to notice a cancelled deadline
+POLL_INTERVAL = 0.25
+
+# Items a stream reader may read ahead of its consumer
+STREAM_BUFFER = 16
+
+# Class to handle timeout exceptions
+class TimeoutException(Exception):
+    pass
+
+# Raised when the deadline was cancelled, e.g. because the client cancelled the job
+class DeadlineCancelled(Exception):
+    pass
+
+class Deadline:
+    """
+    Time budget for one analysis request.
+
+    Unlike a SIGALRM-based timeout this works on any thread and in any event
+    loop. The route creates one deadline per request and it is passed through
+    the first attempt, retries and fallback calls, so they all share the same
+    budget. cancel() makes every wait on the deadline give up immediately.
+    """
+
+    def __init__(self, seconds, parent=None):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds if parent is None else parent.expires_at
+        self.parent = parent
+        self._cancelled = threading.Event()
+
+    def child(self):
+        """
+        A deadline with the same expiry that can be cancelled on its own, e.g. for one
+        of several racing attempts. Cancelling this deadline cancels the child too.
+        """
+        return Deadline(self.seconds, parent=self)
+
+    def restart(self):
+        """Start the budget again from now, e.g. when a queued job finally runs."""
+        self.expires_at = time.monotonic() + self.seconds
+
+    def remaining(self):
+        """Seconds left in the budget (never negative)."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set() or (self.parent is not None and self.parent.cancelled)
+
+    @property
+    def expired(self):
+        return self.cancelled or self.remaining() <= 0
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def check(self):
+        """Raise if the deadline has been cancelled or the budget is used up."""
+        if self.cancelled:
+            raise DeadlineCancelled("Request was cancelled")
+        if self.remaining() <= 0:
+            raise TimeoutException(f"Timed out after {self.seconds} seconds")
+
+    def sleep(self, seconds):
+        """Sleep for up to seconds, waking early (and raising) if the deadline is cancelled."""
+        end = time.monotonic() + min(seconds, self.remaining())
+        while not self.cancelled and time.monotonic() < end:
+            # Polls so that cancelling a parent deadline also ends the sleep
+            self._cancelled.wait(max(0.0, min(POLL_INTERVAL, end - time.monotonic())))
+        self.check()
+
+    async def sleep_async(self, seconds):
+        """Async sleep for up to seconds, raising afterwards if the deadline was cancelled or used up."""
+        await asyncio.sleep(min(seconds, self.remaining()))
+        self.check()
+
+    def wait(self, future):
+        """Wait for a concurrent.futures.Future, giving up when the deadline expires or is cancelled."""
+        while True:
+            self.check()
+            try:
+                return future.result(timeout=min(self.remaining(), POLL_INTERVAL))
+            except FutureTimeoutError:
+                continue
+
+    def run(self, func, *args, **kwargs):
+        """
+        Call func(*args, **kwargs) within the deadline.
+
+        The call runs on a daemon thread. If the deadline passes first, that
+        thread is abandoned and the caller gets TimeoutException straight away
+        instead of being blocked until the upstream call returns.
+        """
+        self.check()
+        future = Future()
+
+        def target():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(func(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=target, name='upstream-call', daemon=True).start()
+        try:
+            return self.wait(future)
+        except (TimeoutException, DeadlineCancelled):
+            future.cancel()
+            raise
+    def iterate(self, iterable):
+        """
+        Iterate over iterable (e.g. a streamed upstream response) within the deadline.
+
+        One daemon thread reads the whole stream into a bounded queue, and each
+        wait for the next item is bounded by what is left of the deadline. When
+        the deadline passes or the consumer stops early, the reader stops at the
+        next item instead of draining the rest of the stream.
+        """
+        self.check()
+        items = queue.Queue(maxsize=STREAM_BUFFER)
+        stop = threading.Event()
+
+        def put(entry):
+            while not stop.is_set():
+                try:
+                    items.put(entry, timeout=POLL_INTERVAL)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def reader():
+            try:
+                for item in iterable:
+                    if not put(('item', item)):
+                        return
+                put(('end', None))
+            except BaseException as e:
+                put(('error', e))
+
+        threading.Thread(target=reader, name='stream-reader', daemon=True).start()
+        try:
+            while True:
+                self.check()
+                try:
+                    kind, value = items.get(timeout=min(self.remaining(), POLL_INTERVAL))
+                except queue.Empty:
+                    continue
+                if kind == 'end':
+                    return
+                if kind == 'error':
+                    raise value
+                yield value
+        finally:
+            stop.set()
+
+    async def run_async(self, awaitable):
+        """Await awaitable within the deadline, cancelling it if the deadline expires or is cancelled."""
+        self.check()
+        task = asyncio.ensure_future(awaitable)
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=min(self.remaining(), POLL_INTERVAL))
+                if done:
+                    return task.result()
+                self.check()
+        finally:
+            if not task.done():
+                task.cancel()
@@ -1,59 +1,22 @@
-import os
+import asyncio
 import logging
-import google.generativeai as genai
-import gc  # For garbage collection
-import functools
 import time
-import signal
-from contextlib import contextmanager
-
-# Configure Gemini API Key
-GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "")
-if not GEMINI_API_KEY:
-    logging.warning("Warning: GEMINI_API_KEY environment variable not set.")
-else:
-    genai.configure(api_key=GEMINI_API_KEY)
-
-# Class to handle timeout exceptions
-class TimeoutException(Exception):
-    pass
-
-# Context manager for timeouts
-@contextmanager
-def time_limit(seconds):
-    def signal_handler(signum, frame):
-        raise TimeoutException("Timed out!")
-    
-    # Set the timeout handler
-    signal.signal(signal.SIGALRM, signal_handler)
-    signal.alarm(seconds)
-    try:
-        yield
-    finally:
-        # Reset the alarm
-        signal.alarm(0)
-
-# Retry decorator for API calls
-def retry_api_call(max_retries=3, backoff_factor=1.0):
-    def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            retries = 0
-            while retries < max_retries:
-                try:
-                    return func(*args, **kwargs)
-                except Exception as e:
-                    retries += 1
-                    if retries >= max_retries:
-                        raise
-                    logging.warning(f"API call failed, retrying ({retries}/{max_retries}): {e}")
-                    # Exponential backoff
-                    time.sleep(backoff_factor * (2 ** (retries - 1)))
-                    # Force garbage collection before retry
-                    gc.collect()
-            return None  # Should never reach here
-        return wrapper
-    return decorator
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import settings
+from app.services.deadline import Deadline, DeadlineCancelled, TimeoutException
+from app.services.llm_backends import get_backend, estimate_tokens
+from app.services.memory_policy import after_analysis
+from app.services.metrics import STAGE_SECONDS, TIMEOUTS, UPSTREAM_REJECTED, TRUNCATIONS, SENTINELS, record_token_usage, record_token_counts, token_usage
+from app.services.prompts import build_request_suffix, build_segment_suffix, build_merge_suffix, SENTINEL_RESPONSES, SYSTEM_PREFIX, SYSTEM_PREFIX_VERSION, DATA_NOT_REDACTED_RESPONSE, NO_SEGMENT_FINDINGS
+from app.services.compaction import compact_transcript
+from app.services.precheck import precheck_transcript
+from app.services.transcript import split_utterances
+from app.services.hedging import hedged_generate, hedged_generate_async
+from app.services.upstream_policy import call_upstream, UpstreamUnavailable
+from app.services.result_cache import get_result_cache, cache_key, is_cacheable
+
+MODEL_NAME = settings.GEMINI_MODEL
 
 def chunk_text(text, max_chunk_size=25000):
     """
@@ -64,219 +27,443 @@ def chunk_text(text, max_chunk_size=25000):
         return [text]
     
     chunks = []
-    lines = text.split('\n')
     current_chunk = []
     current_size = 0
     
-    for line in lines:
-        line_size = len(line) + 1  # +1 for the newline
-        if current_size + line_size > max_chunk_size and current_chunk:
-            chunks.append('\n'.join(current_chunk))
-            current_chunk = [line]
-            current_size = line_size
-        else:
-            current_chunk.append(line)
-            current_size += line_size
+    for utterance in split_utterances(text):
+        # Keep an utterance together unless it is too big for a chunk on its own
+        utterance_size = sum(len(line) + 1 for line in utterance)  # +1 for each newline
+        pieces = [utterance] if utterance_size <= max_chunk_size else [[line] for line in utterance]
+        for lines in pieces:
+            size = sum(len(line) + 1 for line in lines)
+            if current_size + size > max_chunk_size and current_chunk:
+                chunks.append('\n'.join(current_chunk))
+                current_chunk = []
+                current_size = 0
+            current_chunk.extend(lines)
+            current_size += size
     
     if current_chunk:
         chunks.append('\n'.join(current_chunk))
     
     return chunks
 
-@retry_api_call(max_retries=2)
-def analyze_transcript(transcript, sales_rep_names, merchant_names):
-    """
-    Analyzes a transcript using Gemini AI.
-    
-    Args:
-        transcript (str): The transcript to analyze
-        sales_rep_names (str): Names of sales representatives
-        merchant_names (str): Names of merchants
-        
-    Returns:
-        dict: Analysis results or error message
+def create_model():
     """
-    try:
-        # Check if API key is configured before making API call 
-        if not GEMINI_API_KEY:
-            logging.error("Gemini API key not configured.")
-            return {'error': 'AI service not configured. API key is missing.'}
-
-        # Hard limit transcript size to prevent memory issues
-        max_transcript_length = 30000  # Characters
-        if len(transcript) > max_transcript_length:
-            truncated_transcript = transcript[:max_transcript_length] + "\n...[transcript truncated due to length limits]"
-            logging.warning(f"Transcript truncated from {len(transcript)} to {len(truncated_transcript)} characters")
-            transcript = truncated_transcript
-
-        # Construct the prompt for Gemini, keeping everything else the same
-        prompt = f"""# Funnel‑Coach‑Gem v1‑2025‑05‑21 (Rev 7)‑explore‑100pt (Explore‑stage calls)
-
-## ROLE
-
-You are a revenue‑enablement coach. As a revenue‑enablement coach, your evaluation of these Explore‑stage calls is critical because this stage is designed to build trust, thoroughly understand the merchant's business, establish their needs and wants, identify barriers, and ultimately gain the merchant's acceptance of requirements. Evaluate **Explore‑stage** sales‑call transcripts for:
-
-* Effective use of the **funneling technique**
-* How thoroughly the seller uncovers **pains**, **motivations**, and secures **commitments**
-
----
-
-## 1 Pre‑check: Speaker roles
+    Returns the model used for transcript analysis from the configured LLM backend.
 
-**Inspect the speaker labels first.** Based on the user's input: Sales Rep(s): {sales_rep_names}. Merchant(s): {merchant_names}.
-
-If it is **not explicitly clear** from the transcript who the sales‑rep(s) is/are and who the merchant(s) is/are, even with this information:
-
-1. **Do NOT score the call.**
-2. Respond **exactly** with:
+    The model takes only the per-request prompt suffix; the static rubric
+    prefix is attached (or served from the upstream cache) by the backend.
+    """
+    return get_backend().get_model(MODEL_NAME)
 
-```
-NEED_SPEAKER_ROLES: Please specify which speaker(s) is/are the sales rep(s) and which is/are the merchant(s) so I can evaluate the call.
-```
+def match_sentinel(text):
+    """
+    Matches the start of a (possibly partial) model response against the sentinel replies.
 
-3. Wait for clarification, then continue.
+    Returns:
+        tuple: (sentinel, undecided) - sentinel is the full sentinel response if the
+               text starts with one; undecided is True while the text is still too
+               short to tell whether it is a sentinel or an analysis.
+    """
+    head = text.lstrip()
+    for key, sentinel in SENTINEL_RESPONSES.items():
+        if head.startswith(key):
+            return sentinel, False
+    undecided = not head or any(key.startswith(head) for key in SENTINEL_RESPONSES)
+    return None, undecided
+
+def sentinel_result(sentinel):
+    """Builds the response for a sentinel reply and counts it."""
+    key = next((key for key, value in SENTINEL_RESPONSES.items() if value == sentinel), 'unknown')
+    SENTINELS.labels(sentinel=key).inc()
+    return {'analysis_text': sentinel, 'is_error': True}
+
+def run_precheck(transcript, sales_rep_names, merchant_names):
+    """Runs the local pre-check when enabled. Returns the sentinel response to send, or None."""
+    if not settings.PRECHECK_ENABLED:
+        return None
+    with STAGE_SECONDS.labels(stage='precheck').time():
+        return precheck_transcript(transcript, sales_rep_names, merchant_names)
+
+def upstream_unavailable_result(error):
+    """Builds the response for an analysis refused because the upstream circuit breaker is open."""
+    UPSTREAM_REJECTED.inc()
+    logging.warning(f"Analysis refused: {error}")
+    return {'error': 'AI service is temporarily unavailable. Please try again shortly.',
+            'retry_after': error.retry_after}
+
+def map_transcript_chunks(model, transcript, sales_rep_names, merchant_names, deadline):
+    """
+    Map stage of long-transcript analysis: analyses every chunk of the transcript concurrently.
 
-Only proceed once roles are unambiguous.
+    Chunks are split on speaker boundaries with chunk_text and analysed on a
+    bounded thread pool, so the wall-clock time follows the slowest chunk
+    rather than the total length. All chunks share a child of the request's
+    deadline, which is cancelled on the way out so that chunks still in flight
+    after an early exit stop spending upstream quota.
 
----
+    Returns:
+        tuple: (findings, None) with each chunk's findings in call order, or
+               (None, result) with the response to return instead - DATA_NOT_REDACTED
+               from any chunk, or an error. Other sentinels concern the whole call,
+               so a chunk answering one just contributes NO_SEGMENT_FINDINGS.
+    """
+    chunks = chunk_text(transcript, settings.LONG_TRANSCRIPT_CHUNK_SIZE)
+    logging.info(f"Analysing {len(transcript)} character transcript in {len(chunks)} chunks")
+    stage = deadline.child()
+
+    def analyse_chunk(number, chunk):
+        prompt = build_segment_suffix(chunk, number, len(chunks), sales_rep_names, merchant_names)
+        with STAGE_SECONDS.labels(stage='upstream').time():
+            response = call_upstream(model.generate_content, prompt, deadline=stage)
+        record_token_usage(response, SYSTEM_PREFIX + prompt)
+        return response.text
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(settings.LONG_TRANSCRIPT_PARALLELISM, len(chunks))),
+                                  thread_name_prefix='transcript-chunk')
+    try:
+        futures = [executor.submit(analyse_chunk, number, chunk) for number, chunk in enumerate(chunks, start=1)]
+        findings = []
+        for number, future in enumerate(futures, start=1):
+            try:
+                text = stage.wait(future)
+            except TimeoutException:
+                TIMEOUTS.inc()
+                logging.error(f"Chunk {number} of {len(chunks)} timed out after {deadline.seconds} seconds")
+                return None, {'error': 'Analysis timed out. Please try again later.'}
+
+            sentinel, _ = match_sentinel(text or '')
+            if sentinel == DATA_NOT_REDACTED_RESPONSE:
+                return None, sentinel_result(sentinel)
+            if sentinel:
+                # Role and input checks concern the whole call, not one segment of it
+                logging.warning(f"Chunk {number} of {len(chunks)} answered {sentinel.split(':')[0]}, ignoring it")
+                findings.append(NO_SEGMENT_FINDINGS)
+                continue
+            if not text or not text.strip():
+                logging.error(f"Gemini API returned no content for chunk {number} of {len(chunks)}")
+                return None, {'error': 'AI service returned no content for part of the transcript.'}
+            findings.append(text)
+        return findings, None
+    finally:
+        # Don't start queued chunks after a failure, and abandon those in flight
+        executor.shutdown(wait=False, cancel_futures=True)
+        stage.cancel()
 
-## 2 Funneling technique definition
+def build_analysis_prompt(model, transcript, sales_rep_names, merchant_names, deadline):
+    """
+    Compacts the transcript and builds the prompt suffix for the final upstream call.
 
-The funnel technique progresses from broad to specific: starting with Thinking questions (Triggers), moving to multiple Explore questions to gather details, then to Narrow/Confirm questions to verify understanding, and often concluding with a Sweeper question.
+    The transcript is always tidied with compact_transcript. If it is still over
+    TRANSCRIPT_TOKEN_BUDGET, long-transcript mode analyses it in parallel chunks
+    and the prompt merges their findings; otherwise it is compacted further to fit.
 
-| Stage                | Purpose & Typical Use                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                           | Typical form                                                                                       |
-| -------------------- | ------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------- | -------------------------------------------------------------------------------------------------- |
-| **Thinking**         | Wide and unbiased questions that will result in long answers. Normally used to start a new funnel or to provoke thinking during an existing funnel.                                                                                                                                                                                                                                                                                                                                                                             | Open "How/Why" question (e.g., "How do payments affect your company goals?")                       |
-|                      | **Non-Examples / Common Pitfalls for Thinking Questions:**  - A question that primarily seeks factual recall (e.g., "What system do you use?") is typically Explore, not Thinking.  - A question that is very narrow or seeks a yes/no answer is likely Narrow/Confirm.                                                                                                                                                                                                                                                         |                                                                                                    |
-| **Explore (broad)**  | In response to a trigger, in‑order to learn more about a topic. Normally used to drill deeper during an existing funnel, or to start a new funnel in response to a trigger.                                                                                                                                                                                                                                                                                                                                                     | Who, what, when, where, why, which, how (e.g., "When did this start happening?")                   |
-|                      | **Non-Examples / Common Pitfalls for Explore Questions:**  - A simple statement like 'That's interesting' or 'Tell me more' (without a question mark or interrogative structure) is not an Explore question. It must be phrased as a question.  - A question that is primarily seeking a yes/no answer to validate information (e.g., 'So, you're saying X is the main issue?') is a Narrow/Confirm question.                                                                                                                   |                                                                                                    |
-| **Narrow / Confirm** | Narrow questions to confirm something. Normally used at the end of funnels, or if there is no need for a funnel, in response to something said by the customer.                                                                                                                                                                                                                                                                                                                                                                 | If / do / is / are style (e.g., "If you fix this problem, will it help you to achieve your goal?") |
-|                      | **Non-Examples / Common Pitfalls for Narrow/Confirm Questions:**  - An open‑ended question like 'What are your thoughts on that solution?' is likely Thinking or Explore, not Narrow/Confirm. Narrow/Confirm questions are typically closed‑ended and seek specific validation of information already discussed.  - Simply repeating a merchant's statement as a statement (e.g., "So, APMs are costing you sales.") is not a Narrow/Confirm question unless phrased interrogatively (e.g., "So, are APMs costing you sales?"). |                                                                                                    |
-| **Sweeper**          | Surface anything missed or summarise problem/next steps.                                                                                                                                                                                                                                                                                                                                                                                                                                                                        | "Is there anything else we should cover?" / summary statement                                      |
-|                      | **Non-Examples / Common Pitfalls for Sweeper Questions:**  - A question that introduces a completely new topic is likely a Thinking question, not a Sweeper.  - A generic closing like "Thanks for your time" is not a Sweeper question/statement for scoring purposes unless it also explicitly asks if anything was missed or summarises.                                                                                                                                                                                     |                                                                                                    |
+    Returns:
+        tuple: (prompt, None), or (None, result) with the response to return instead
+    """
+    budget = settings.TRANSCRIPT_TOKEN_BUDGET
+    with STAGE_SECONDS.labels(stage='prompt_build').time():
+        original_length = len(transcript)
+        transcript, shortened = compact_transcript(transcript, sales_rep_names, merchant_names,
+                                                   None if settings.LONG_TRANSCRIPT_MODE else budget)
+        logging.info(f"Compacted transcript from {original_length} to {len(transcript)} characters")
+        if shortened:
+            TRUNCATIONS.inc()
+
+    if settings.LONG_TRANSCRIPT_MODE and estimate_tokens(transcript) > budget:
+        # Analyse the whole call in parallel chunks, then merge the findings in one pass
+        findings, result = map_transcript_chunks(model, transcript, sales_rep_names, merchant_names, deadline)
+        if result:
+            return None, result
+        with STAGE_SECONDS.labels(stage='prompt_build').time():
+            return build_merge_suffix(findings, sales_rep_names, merchant_names), None
+
+    with STAGE_SECONDS.labels(stage='prompt_build').time():
+        return build_request_suffix(transcript, sales_rep_names, merchant_names), None
+
+def should_cache(result):
+    """
+    Only successful analyses by the primary model are cached. The cache key names
+    MODEL_NAME, so a fallback model's answer must not be served for it later.
+    """
+    return is_cacheable(result) and result.get('model', MODEL_NAME) == MODEL_NAME
 
-**Classification rules:**
+def analyze_transcript(transcript, sales_rep_names, merchant_names, deadline=None):
+    """
+    Analyzes a transcript using Gemini AI, reusing a cached result for repeat submissions.
 
-1. *Each seller utterance can belong to **one and only one** question category (Thinking, Explore, Narrow/Confirm, or Sweeper). Never double‑classify the same question.*
-2. *If an utterance contains **two or more distinct questions**, classify the **first interrogative clause** only; ignore the rest for scoring.*
+    Args:
+        transcript (str): The transcript to analyze
+        sales_rep_names (str): Names of sales representatives
+        merchant_names (str): Names of merchants
+        deadline (Deadline): Time budget for the whole analysis; defaults to ANALYSIS_TIMEOUT_SECONDS
 
-A **successful (complete) funnel** = **Thinking ➜ Explore ➜ ≥ 1 Narrow/Confirm** question asked by the **sales rep**.
+    Returns:
+        dict: Analysis results or error message
+    """
+    cache = get_result_cache()
+    key = cache_key(transcript, sales_rep_names, merchant_names, MODEL_NAME, SYSTEM_PREFIX_VERSION)
+    cached = cache.get(key)
+    if cached is not None:
+        logging.info("Returning cached analysis")
+        return cached
 
----
+    if deadline is None:
+        deadline = Deadline(settings.ANALYSIS_TIMEOUT_SECONDS)
 
-## 3 Input assumptions
+    started = time.monotonic()
+    try:
+        result, tokens = _analyze_uncached(transcript, sales_rep_names, merchant_names, deadline)
+    finally:
+        after_analysis()
+    if should_cache(result):
+        cache.put(key, result, time.monotonic() - started, *tokens)
+    return result
 
-* Transcript is plain text.
-* Each line begins with a speaker name followed by a colon (e.g., `Alice:`).
-* Timestamps like `[00:03:21]` are optional.
-* **No un‑redacted card data or personal identifiers.** If detected, respond exactly with `DATA_NOT_REDACTED`.
+def _analyze_uncached(transcript, sales_rep_names, merchant_names, deadline):
+    """
+    Analyzes a transcript using Gemini AI.
+    
+    Args:
+        transcript (str): The transcript to analyze
+        sales_rep_names (str): Names of sales representatives
+        merchant_names (str): Names of merchants
+        deadline (Deadline): Time budget shared by the first attempt and any retries
+        
+    Returns:
+        tuple: (result, (prompt_tokens, output_tokens)) - the analysis results or
+               error message, and the token counts of the final upstream call
+    """
+    try:
+        prompt, result = prepare_analysis(transcript, sales_rep_names, merchant_names, deadline)
+        if result:
+            return result, (0, 0)
+
+        # Retries, rate limiting and the circuit breaker are applied to every attempt
+        with STAGE_SECONDS.labels(stage='upstream').time():
+            response, model_name, attempt = hedged_generate(MODEL_NAME, prompt, deadline)
+        return response_result(response, prompt, model_name, attempt), token_usage(response, SYSTEM_PREFIX + prompt)
+    except Exception as e:
+        return exception_result(e, deadline), (0, 0)
 
----
+async def analyze_transcript_async(transcript, sales_rep_names, merchant_names, deadline=None):
+    """
+    Async version of analyze_transcript for the ASGI app.
 
-## 6 Style rules
+    The upstream call is awaited with the SDK's async API, so an in-flight
+    analysis holds no thread while it waits for Gemini. The pre-check, prompt
+    building and cache access are short and run on the default executor; only
+    long-transcript chunk analysis still uses threads.
 
-* Quote all utterances verbatim in bullet lists.
-* Use **British spelling**.
-* Never fabricate dialogue.
-* If transcript exceeds context length, analyse the earliest portion that contains at least the first two complete funnels if possible, or up to the first 15 rep utterances if two funnels aren't present that early.
-* If the input is not a transcript or is nonsensical, respond `UNSUPPORTED_INPUT`.
+    Returns:
+        dict: Analysis results or error message, the same as analyze_transcript
+    """
+    cache = get_result_cache()
+    key = cache_key(transcript, sales_rep_names, merchant_names, MODEL_NAME, SYSTEM_PREFIX_VERSION)
+    cached = await asyncio.to_thread(cache.get, key)
+    if cached is not None:
+        logging.info("Returning cached analysis")
+        return cached
+
+    if deadline is None:
+        deadline = Deadline(settings.ANALYSIS_TIMEOUT_SECONDS)
+
+    started = time.monotonic()
+    tokens = (0, 0)
+    try:
+        prompt, result = await asyncio.to_thread(prepare_analysis, transcript, sales_rep_names,
+                                                 merchant_names, deadline)
+        if not result:
+            with STAGE_SECONDS.labels(stage='upstream').time():
+                response, model_name, attempt = await hedged_generate_async(MODEL_NAME, prompt, deadline)
+            result = response_result(response, prompt, model_name, attempt)
+            tokens = token_usage(response, SYSTEM_PREFIX + prompt)
+    except Exception as e:
+        result = exception_result(e, deadline)
+    finally:
+        after_analysis()
+    if should_cache(result):
+        await asyncio.to_thread(cache.put, key, result, time.monotonic() - started, *tokens)
+    return result
 
----
+def prepare_analysis(transcript, sales_rep_names, merchant_names, deadline):
+    """
+    Everything before the final upstream call: the local pre-check, the
+    configuration check and building the prompt (mapping long transcripts).
 
-## Version tag
+    Returns:
+        tuple: (prompt, None), or (None, result) with the response to return instead
+    """
+    # Reject bad submissions locally, before any API call
+    sentinel = run_precheck(transcript, sales_rep_names, merchant_names)
+    if sentinel:
+        return None, sentinel_result(sentinel)
 
-`Funnel‑Coach‑Gem v1‑2025‑05‑21 (Rev 7)‑explore‑100pt`
+    # Check if API key is configured before making API call
+    if not get_backend().is_configured():
+        logging.error("Gemini API key not configured.")
+        return None, {'error': 'AI service not configured. API key is missing.'}
 
----
+    return build_analysis_prompt(create_model(), transcript, sales_rep_names, merchant_names, deadline)
 
-## CALL TRANSCRIPT TO ANALYZE:
+def response_result(response, prompt, model_name=MODEL_NAME, attempt=1):
+    """
+    Turns the final upstream response into the analysis result or an error dict.
 
-Sales Rep(s) indicated as: {sales_rep_names}
-Merchant(s) indicated as: {merchant_names}
+    Successful analyses and sentinel replies record the model and attempt that produced them.
+    """
+    # Handle specific error responses
+    if not hasattr(response, 'text'):
+        logging.error(f"Gemini API returned an empty or malformed response: {response}")
+        return {'error': 'AI service returned an empty response. Please try again with a shorter transcript.'}
+
+    record_token_usage(response, SYSTEM_PREFIX + prompt)
+
+    if response.text in SENTINEL_RESPONSES.values():
+        return dict(sentinel_result(response.text), model=model_name, attempt=attempt)
+
+    # Check for empty response
+    if not response.text or not response.text.strip():
+        logging.error(f"Gemini API returned an empty or malformed response: {response}")
+        prompt_feedback_msg = ""
+        if hasattr(response, 'prompt_feedback') and response.prompt_feedback and hasattr(response.prompt_feedback, 'block_reason'):
+            prompt_feedback_msg = f" (Reason: {response.prompt_feedback.block_reason_message})"
+        return {'error': f'AI service returned no content.{prompt_feedback_msg}'}
+
+    # Return successful response
+    return {'analysis_text': response.text, 'model': model_name, 'attempt': attempt}
+
+def exception_result(error, deadline):
+    """Turns an exception raised while analysing into an error dict."""
+    if isinstance(error, TimeoutException):
+        TIMEOUTS.inc()
+        logging.error(f"Gemini API call timed out after {deadline.seconds} seconds")
+        return {'error': 'Analysis timed out. Please try with a shorter transcript.'}
+    if isinstance(error, DeadlineCancelled):
+        logging.info("Analysis cancelled before Gemini responded")
+        return {'error': 'Analysis cancelled.'}
+    if isinstance(error, UpstreamUnavailable):
+        return upstream_unavailable_result(error)
+
+    logging.error(f"Error processing request: {error}")
+    # Check if it's a Google API error for more specific feedback
+    if error.args and isinstance(error.args[0], str) and "API key not valid" in error.args[0]:
+        return {'error': 'Invalid Gemini API Key. Please check your configuration.'}
+    return {'error': f'An error occurred processing your request: {str(error)}'}
+
+def stream_analysis(transcript, sales_rep_names, merchant_names, deadline=None):
+    """
+    Analyzes a transcript using Gemini AI, yielding the output as it is generated.
 
-```text
-{transcript}
-```
+    The first few chunks are held back until it is clear whether the model is
+    answering with one of the sentinel replies, so those are still reported
+    as errors rather than streamed as analysis text.
 
-## ANALYSIS AND EVALUATION:
-(Begin your analysis here, focusing only on identifying the basic question types and funnels. Due to space constraints, provide a simplified analysis with these key elements:)
-1. Identify the main question types (Thinking, Explore, Narrow/Confirm, Sweeper)
-2. Find complete funnels following the Thinking → Explore → Narrow/Confirm pattern
-3. Note any significant pains articulated by the merchant
-4. Provide a brief score estimation
+    Args:
+        transcript (str): The transcript to analyze
+        sales_rep_names (str): Names of sales representatives
+        merchant_names (str): Names of merchants
+        deadline (Deadline): Time budget for the whole generation; defaults to ANALYSIS_TIMEOUT_SECONDS
 
-Keep your response concise and under 2000 words.
-"""
+    Yields:
+        tuple: (event, data) pairs - ('chunk', {'text': ...}) for each piece of
+               analysis text, then a single ('done', result) with the same shape
+               analyze_transcript returns, or ('error', {'error': ...}).
+    """
+    try:
+        sentinel = run_precheck(transcript, sales_rep_names, merchant_names)
+        if sentinel:
+            yield 'done', sentinel_result(sentinel)
+            return
 
-        # Use a more optimized model configuration with lower temperature for memory efficiency
-        model = genai.GenerativeModel('gemini-2.5-flash-preview-05-20', 
-                                    generation_config=genai.GenerationConfig(
-                                        temperature=0,
-                                        top_p=0.1,
-                                        max_output_tokens=5000  # Reduced output size
-                                    ))
-        
-        # Make the API call with retry and timeout protection
-        try:
-            # Set a timeout for the entire operation
-            with time_limit(300):  # 5 minute timeout
-                # Force garbage collection before API call
-                gc.collect()
-                response = model.generate_content(prompt)
-                # Force garbage collection immediately after API call
-                gc.collect()
-        except TimeoutException:
-            logging.error("Gemini API call timed out after 5 minutes")
-            return {'error': 'Analysis timed out. Please try with a shorter transcript.'}
-        except Exception as e:
-            logging.error(f"First API call failed, retrying: {e}")
-            # Clean up memory before retrying
-            gc.collect()
-            # Retry with a shorter prompt if needed
-            if len(transcript) > 15000:
-                transcript = transcript[:15000] + "\n...[transcript truncated due to length]"
-                prompt = prompt.replace("{transcript}", transcript)
-            # Try again with a delay
-            time.sleep(1)
-            
+        if not get_backend().is_configured():
+            logging.error("Gemini API key not configured.")
+            yield 'error', {'error': 'AI service not configured. API key is missing.'}
+            return
+
+        cache = get_result_cache()
+        key = cache_key(transcript, sales_rep_names, merchant_names, MODEL_NAME, SYSTEM_PREFIX_VERSION)
+        cached = cache.get(key)
+        if cached is not None:
+            logging.info("Returning cached analysis")
+            yield 'chunk', {'text': cached['analysis_text']}
+            yield 'done', cached
+            return
+
+        if deadline is None:
+            deadline = Deadline(settings.ANALYSIS_TIMEOUT_SECONDS)
+        started = time.monotonic()
+
+        model = create_model()
+
+        # Long transcripts are mapped up front; only the final (or merged) report is streamed
+        prompt, result = build_analysis_prompt(model, transcript, sales_rep_names, merchant_names, deadline)
+        if result:
+            yield ('done' if 'analysis_text' in result else 'error'), result
+            return
+        upstream_started = time.perf_counter()
+        response = call_upstream(model.generate_content, prompt, stream=True, deadline=deadline)
+
+        pending = ''  # Text held back while it could still be a sentinel
+        streaming = False
+        parts = []
+        # One reader thread per stream; each wait for the next chunk is bounded by the deadline
+        for chunk in deadline.iterate(response):
             try:
-                with time_limit(300):  # 5 minute timeout for retry
-                    response = model.generate_content(prompt)
-                    gc.collect()
-            except TimeoutException:
-                logging.error("Retry API call also timed out")
-                return {'error': 'Analysis timed out. Please try again with a much shorter transcript.'}
-        
-        # Force garbage collection to free memory
-        gc.collect()
-        
-        # Handle specific error responses
-        if not hasattr(response, 'text'):
-            logging.error(f"Gemini API returned an empty or malformed response: {response}")
-            return {'error': 'AI service returned an empty response. Please try again with a shorter transcript.'}
-            
-        if response.text == "NEED_SPEAKER_ROLES: Please specify which speaker(s) is/are the sales rep(s) and which is/are the merchant(s) so I can evaluate the call.":
-            return {'analysis_text': response.text, 'is_error': True}
-        elif response.text == "DATA_NOT_REDACTED":
-            return {'analysis_text': response.text, 'is_error': True}
-        elif response.text == "UNSUPPORTED_INPUT":
-            return {'analysis_text': response.text, 'is_error': True}
-        
-        # Check for empty response
-        if not response.text or not response.text.strip():
-            logging.error(f"Gemini API returned an empty or malformed response: {response}")
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. a final safety-rating chunk)
+                continue
+            if not text:
+                continue
+
+            if not streaming:
+                pending += text
+                sentinel, undecided = match_sentinel(pending)
+                if sentinel:
+                    yield 'done', sentinel_result(sentinel)
+                    return
+                if undecided:
+                    continue
+                streaming = True
+                text, pending = pending, ''
+
+            parts.append(text)
+            yield 'chunk', {'text': text}
+
+        STAGE_SECONDS.labels(stage='upstream').observe(time.perf_counter() - upstream_started)
+        analysis_text = ''.join(parts) + pending
+        tokens = estimate_tokens(SYSTEM_PREFIX + prompt), estimate_tokens(analysis_text)
+        record_token_counts(*tokens)
+        if not analysis_text.strip():
+            logging.error(f"Gemini API returned an empty streamed response: {response}")
             prompt_feedback_msg = ""
             if hasattr(response, 'prompt_feedback') and response.prompt_feedback and hasattr(response.prompt_feedback, 'block_reason'):
                 prompt_feedback_msg = f" (Reason: {response.prompt_feedback.block_reason_message})"
-            return {'error': f'AI service returned no content.{prompt_feedback_msg}'}
-            
-        # Return successful response
-        return {'analysis_text': response.text}
+            yield 'error', {'error': f'AI service returned no content.{prompt_feedback_msg}'}
+            return
+        if pending:
+            # Short response that never left the sentinel check
+            yield 'chunk', {'text': pending}
+
+        result = {'analysis_text': analysis_text, 'model': MODEL_NAME, 'attempt': 1}
+        cache.put(key, result, time.monotonic() - started, *tokens)
+        yield 'done', result
+    except TimeoutException:
+        TIMEOUTS.inc()
+        logging.error(f"Gemini streaming call timed out after {deadline.seconds} seconds")
+        yield 'error', {'error': 'Analysis timed out. Please try with a shorter transcript.'}
+    except DeadlineCancelled:
+        logging.info("Streaming analysis cancelled")
+        yield 'error', {'error': 'Analysis cancelled.'}
+    except UpstreamUnavailable as e:
+        yield 'error', upstream_unavailable_result(e)
     except Exception as e:
-        logging.error(f"Error processing request: {e}")
-        # Clean up memory
-        gc.collect()
-        # Check if it's a Google API error for more specific feedback
+        logging.error(f"Error streaming analysis: {e}")
         if hasattr(e, 'args') and e.args and isinstance(e.args[0], str) and "API key not valid" in e.args[0]:
-             return {'error': 'Invalid Gemini API Key. Please check your configuration.'}
-        return {'error': f'An error occurred processing your request: {str(e)}'}
\ No newline at end of file
+            yield 'error', {'error': 'Invalid Gemini API Key. Please check your configuration.'}
+            return
+        yield 'error', {'error': f'An error occurred processing your request: {str(e)}'}
+    finally:
+        after_analysis()
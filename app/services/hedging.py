@@ -0,0 +1,226 @@
+import asyncio
+import collections
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from app.config import settings
+from app.services.deadline import POLL_INTERVAL, TimeoutException
+from app.services.llm_backends import get_backend
+from app.services.metrics import HEDGED_ATTEMPTS, ANSWERS
+from app.services.upstream_policy import call_upstream, call_upstream_async
+
+# Number of recent request latencies the hedge delay is computed from
+LATENCY_WINDOW = 500
+
+class LatencyTracker:
+    """Rolling window of final-call latencies, from the first attempt's start to the first good answer."""
+
+    def __init__(self, size=LATENCY_WINDOW):
+        self._samples = collections.deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct):
+        """Nearest-rank percentile of the window, or None with fewer than HEDGE_MIN_SAMPLES samples."""
+        with self._lock:
+            ordered = sorted(self._samples)
+        if len(ordered) < max(1, settings.HEDGE_MIN_SAMPLES):
+            return None
+        rank = max(1, int(round(pct / 100.0 * len(ordered) + 0.5)))
+        return ordered[min(rank, len(ordered)) - 1]
+
+_latencies = LatencyTracker()
+
+def hedge_delay():
+    """Seconds to wait for an attempt before starting the next one on the ladder."""
+    observed = _latencies.percentile(settings.HEDGE_PERCENTILE)
+    if observed is None:
+        return settings.HEDGE_INITIAL_DELAY_SECONDS
+    return max(settings.HEDGE_MIN_DELAY_SECONDS, observed)
+
+def attempt_ladder(primary_model):
+    """
+    Models to try, in order: the primary model, then FALLBACK_MODELS; or, without
+    fallbacks, HEDGE_MAX_ATTEMPTS duplicates of the primary model. Without hedging,
+    only the primary model.
+    """
+    if not settings.HEDGE_ENABLED:
+        return [primary_model]
+    if settings.FALLBACK_MODELS:
+        return [primary_model] + [name for name in settings.FALLBACK_MODELS if name != primary_model]
+    return [primary_model] * max(1, settings.HEDGE_MAX_ATTEMPTS)
+
+def is_good_answer(response):
+    """An answer wins the race only if it has text; empty or blocked responses let the other attempts continue."""
+    try:
+        return bool(response.text and response.text.strip())
+    except (AttributeError, ValueError):
+        return False
+
+def _record_answer(model_name, attempt, started):
+    """
+    Counts the answer and records the request's latency, timed from when the first
+    attempt started. When a hedge wins, this is also a lower bound on the latency
+    of the slower attempts it beat, so the window is not filled with fast winners only.
+    """
+    _latencies.record(time.monotonic() - started)
+    ANSWERS.labels(model=model_name, attempt=str(attempt)).inc()
+    if attempt > 1:
+        logging.info(f"Hedged attempt {attempt} on {model_name} answered first")
+
+def _outlived_race(future):
+    """True if an attempt (Future or Task) was still running when the race ended, or ran out of time."""
+    if not future.done():
+        return True
+    return not future.cancelled() and isinstance(future.exception(), TimeoutException)
+
+def hedged_generate(primary_model, prompt, deadline):
+    """
+    Makes the final upstream call, hedging against the latency tail.
+
+    Starts the first attempt on the primary model. If it has not answered
+    after hedge_delay() (the HEDGE_PERCENTILE latency of recent calls), or
+    has failed, the next attempt on the ladder is started alongside it. The
+    first good answer wins, and the attempts still running are cancelled
+    through their own child deadlines. Every attempt goes through call_upstream,
+    so retries, the rate limit and the circuit breaker still apply.
+
+    Returns:
+        tuple: (response, model_name, attempt), attempt counting from 1
+
+    Raises:
+        The last attempt's exception if every attempt failed
+    """
+    ladder = attempt_ladder(primary_model)
+    backend = get_backend()
+    if len(ladder) == 1:
+        started = time.monotonic()
+        response = call_upstream(backend.get_model(primary_model).generate_content, prompt, deadline=deadline)
+        _record_answer(primary_model, 1, started)
+        return response, primary_model, 1
+
+    executor = ThreadPoolExecutor(max_workers=len(ladder), thread_name_prefix='hedged-attempt')
+    attempts = {}  # future -> (attempt, model_name, child deadline)
+    started = time.monotonic()
+    answered = False
+
+    def launch():
+        attempt = len(attempts) + 1
+        model_name = ladder[attempt - 1]
+        if attempt > 1:
+            HEDGED_ATTEMPTS.labels(model=model_name).inc()
+        child = deadline.child()
+        future = executor.submit(call_upstream, backend.get_model(model_name).generate_content, prompt, deadline=child)
+        attempts[future] = (attempt, model_name, child)
+
+    try:
+        launch()
+        pending = set(attempts)
+        next_hedge_at = time.monotonic() + hedge_delay()
+        last_response = last_error = None
+        while True:
+            deadline.check()
+            done, pending = wait(pending, timeout=min(POLL_INTERVAL, deadline.remaining()), return_when=FIRST_COMPLETED)
+            for future in done:
+                attempt, model_name, _ = attempts[future]
+                try:
+                    response = future.result()
+                except Exception as e:
+                    logging.warning(f"Attempt {attempt} on {model_name} failed: {e}")
+                    last_error = e
+                    continue
+                if is_good_answer(response):
+                    _record_answer(model_name, attempt, started)
+                    answered = True
+                    return response, model_name, attempt
+                last_response = response
+
+            can_hedge = len(attempts) < len(ladder)
+            if can_hedge and (not pending or time.monotonic() >= next_hedge_at):
+                launch()
+                pending |= {future for future in attempts if not future.done()}
+                next_hedge_at = time.monotonic() + hedge_delay()
+            elif not pending:
+                if last_response is not None:
+                    # Every attempt answered, none with content: let the caller report it
+                    attempt, model_name = len(attempts), ladder[len(attempts) - 1]
+                    return last_response, model_name, attempt
+                raise last_error
+    finally:
+        # The primary outlived the whole race (e.g. the deadline ran out): its latency is at least this
+        if not answered and any(attempt == 1 and _outlived_race(future) for future, (attempt, _, _) in attempts.items()):
+            _latencies.record(time.monotonic() - started)
+        # Abandon the losers: their deadlines end their waits and retries straight away
+        for future, (_, _, child) in attempts.items():
+            if not future.done():
+                child.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+async def hedged_generate_async(primary_model, prompt, deadline):
+    """Async version of hedged_generate; the losing attempts' tasks are cancelled outright."""
+    ladder = attempt_ladder(primary_model)
+    backend = get_backend()
+    if len(ladder) == 1:
+        started = time.monotonic()
+        response = await call_upstream_async(backend.get_model(primary_model).generate_content_async,
+                                             prompt, deadline=deadline)
+        _record_answer(primary_model, 1, started)
+        return response, primary_model, 1
+
+    attempts = {}  # task -> (attempt, model_name)
+    started = time.monotonic()
+    answered = False
+
+    def launch():
+        attempt = len(attempts) + 1
+        model_name = ladder[attempt - 1]
+        if attempt > 1:
+            HEDGED_ATTEMPTS.labels(model=model_name).inc()
+        task = asyncio.ensure_future(call_upstream_async(backend.get_model(model_name).generate_content_async,
+                                                         prompt, deadline=deadline.child()))
+        attempts[task] = (attempt, model_name)
+
+    try:
+        launch()
+        pending = set(attempts)
+        next_hedge_at = time.monotonic() + hedge_delay()
+        last_response = last_error = None
+        while True:
+            deadline.check()
+            done, pending = await asyncio.wait(pending, timeout=min(POLL_INTERVAL, deadline.remaining()),
+                                               return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                attempt, model_name = attempts[task]
+                try:
+                    response = task.result()
+                except Exception as e:
+                    logging.warning(f"Attempt {attempt} on {model_name} failed: {e}")
+                    last_error = e
+                    continue
+                if is_good_answer(response):
+                    _record_answer(model_name, attempt, started)
+                    answered = True
+                    return response, model_name, attempt
+                last_response = response
+
+            can_hedge = len(attempts) < len(ladder)
+            if can_hedge and (not pending or time.monotonic() >= next_hedge_at):
+                launch()
+                pending |= {task for task in attempts if not task.done()}
+                next_hedge_at = time.monotonic() + hedge_delay()
+            elif not pending:
+                if last_response is not None:
+                    attempt, model_name = len(attempts), ladder[len(attempts) - 1]
+                    return last_response, model_name, attempt
+                raise last_error
+    finally:
+        if not answered and any(attempt == 1 and _outlived_race(task) for task, (attempt, _) in attempts.items()):
+            _latencies.record(time.monotonic() - started)
+        for task in attempts:
+            if not task.done():
+                task.cancel()
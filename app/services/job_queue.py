@@ -0,0 +1,182 @@
+import os
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import settings
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+# Raised when the pool already holds as many jobs as it is allowed to
+class JobQueueFull(Exception):
+    pass
+
+class JobManager:
+    """
+    Bounded in-process worker pool for long-running analyses.
+
+    Request threads only submit work and read job state; the analysis itself
+    runs on the pool's own threads. At most max_workers jobs run at once and
+    at most max_queue_depth more may wait for a free worker. Finished jobs are
+    kept for result_ttl seconds so clients can poll for them.
+    """
+
+    def __init__(self, max_workers, max_queue_depth, result_ttl):
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analysis-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, on_cancel=None, on_start=None, **kwargs):
+        """
+        Queue func(*args, **kwargs) and return the new job id.
+
+        on_cancel, if given, is called when the job is cancelled while queued or
+        running, so the job can abandon its upstream call. on_start, if given, is
+        called when a worker picks the job up, e.g. to start its time budget then
+        rather than while it waits in the queue.
+        """
+        with self._lock:
+            self._purge_expired()
+            active = sum(1 for job in self._jobs.values() if job['status'] not in FINISHED_STATES)
+            if active >= self.max_workers + self.max_queue_depth:
+                raise JobQueueFull(f"{active} analysis jobs already queued or running")
+
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                'id': job_id,
+                'status': QUEUED,
+                'created_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+                'result': None,
+                'error': None,
+                'future': None,
+                'on_cancel': on_cancel,
+                'on_start': on_start,
+            }
+            self._jobs[job_id]['future'] = self._executor.submit(self._run, job_id, func, args, kwargs)
+        return job_id
+
+    def get(self, job_id):
+        """Return a JSON-serialisable snapshot of the job, or None if unknown or expired."""
+        with self._lock:
+            self._purge_expired()
+            job = self._jobs.get(job_id)
+            return self._snapshot(job) if job else None
+
+    def cancel(self, job_id):
+        """
+        Cancel a job. Queued jobs never start; running jobs are marked cancelled,
+        told to stop through their on_cancel hook, and their result is discarded.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job:
+                return None
+            if job['status'] not in FINISHED_STATES:
+                job['future'].cancel()
+                if job['on_cancel']:
+                    job['on_cancel']()
+                job['status'] = CANCELLED
+                job['finished_at'] = time.time()
+            return self._snapshot(job)
+
+    def _run(self, job_id, func, args, kwargs):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job['status'] != QUEUED:
+                return
+            job['status'] = RUNNING
+            job['started_at'] = time.time()
+            if job['on_start']:
+                job['on_start']()
+
+        try:
+            result = func(*args, **kwargs)
+            status, error = COMPLETED, None
+        except Exception as e:
+            logging.error(f"Analysis job {job_id} failed: {e}")
+            result, status, error = None, FAILED, f'An error occurred processing your request: {str(e)}'
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job['status'] == CANCELLED:
+                return
+            job['status'] = status
+            job['result'] = result
+            job['error'] = error
+            job['finished_at'] = time.time()
+
+    def _purge_expired(self):
+        # Caller must hold self._lock
+        cutoff = time.time() - self.result_ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job['status'] in FINISHED_STATES and job['finished_at'] < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    @staticmethod
+    def _snapshot(job):
+        snapshot = {
+            'job_id': job['id'],
+            'status': job['status'],
+            'created_at': job['created_at'],
+            'started_at': job['started_at'],
+            'finished_at': job['finished_at'],
+        }
+        if job['status'] == COMPLETED:
+            snapshot['result'] = job['result']
+        elif job['status'] == FAILED:
+            snapshot['error'] = job['error']
+        return snapshot
+
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+# Jobs live in one process's memory, so with several worker processes a poll
+# can land on a worker that never saw the job. gunicorn.conf.py turns job mode
+# off in that case.
+_single_process = True
+
+def disable_job_mode():
+    """Called in each worker when gunicorn runs more than one."""
+    global _single_process
+    _single_process = False
+
+def job_mode_available():
+    return _single_process
+
+def get_job_manager():
+    """
+    Return this process's job manager, creating it on first use.
+
+    The pool is created lazily rather than in create_app because gunicorn's
+    --preload imports the app in the master process, and threads started there
+    do not survive the fork into the workers.
+    """
+    global _job_manager
+    if _job_manager is None:
+        with _job_manager_lock:
+            if _job_manager is None:
+                _job_manager = JobManager(settings.JOB_WORKERS, settings.JOB_QUEUE_DEPTH, settings.JOB_RESULT_TTL)
+    return _job_manager
+
+def _reset_after_fork():
+    global _job_manager, _job_manager_lock
+    _job_manager = None
+    _job_manager_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,221 @@
+import logging
+
+from app.config import settings
+from app.services.batch_service import MAX_TRANSCRIPT_LENGTH
+from app.services.compaction import compact_transcript
+from app.services.deadline import Deadline
+from app.services.gemini_service import (MODEL_NAME, match_sentinel, sentinel_result, response_result,
+                                         exception_result)
+from app.services.hedging import hedged_generate_async
+from app.services.llm_backends import get_backend
+from app.services.metrics import STAGE_SECONDS, record_token_usage
+from app.services.precheck import scan_transcript, check_speaker_roles, MIN_SPEAKERS
+from app.services.prompts import (build_live_segment_suffix, build_merge_suffix, SYSTEM_PREFIX,
+                                  DATA_NOT_REDACTED_RESPONSE, UNSUPPORTED_INPUT_RESPONSE, NO_SEGMENT_FINDINGS,
+                                  LIVE_FEEDBACK_HEADING, LIVE_FINDINGS_HEADING, LIVE_SUMMARY_HEADING)
+from app.services.transcript import parse_speaker_line
+
+class LiveSessionError(Exception):
+    """The client broke the session's limits; the message is safe to send back."""
+
+def split_live_response(text):
+    """
+    Splits a live-segment response into its three headed sections.
+
+    Returns:
+        tuple: (feedback, findings, summary); without the headings, the whole
+               text is used as both the feedback and the findings
+    """
+    headings = [LIVE_FEEDBACK_HEADING, LIVE_FINDINGS_HEADING, LIVE_SUMMARY_HEADING]
+    found = sorted((text.find(heading), heading) for heading in headings if heading in text)
+    if not found:
+        return text.strip(), text.strip(), ''
+    sections = {}
+    for number, (position, heading) in enumerate(found):
+        end = found[number + 1][0] if number + 1 < len(found) else len(text)
+        sections[heading] = text[position + len(heading):end].strip()
+    return (sections.get(LIVE_FEEDBACK_HEADING, ''),
+            sections.get(LIVE_FINDINGS_HEADING) or text.strip(),
+            sections.get(LIVE_SUMMARY_HEADING, ''))
+
+class LiveSession:
+    """
+    State of one live call: the transcript lines not yet analysed, the
+    findings of every analysed segment and a running summary of the call.
+
+    Lines are gathered into utterances, and an utterance is finished when the
+    next speaker starts. Once the finished utterances reach LIVE_SEGMENT_CHARS
+    they are closed as a segment. Each segment is analysed on its own with
+    only the running summary for context, so an update costs the same at the
+    end of a long call as at the start. Closing the session merges the
+    segment findings into the usual full report.
+    """
+
+    def __init__(self, sales_rep_names, merchant_names):
+        self.sales_rep_names = sales_rep_names
+        self.merchant_names = merchant_names
+        self.findings = []
+        self.summary = ''
+        self.total_chars = 0
+        self._finished = []  # Lines of finished utterances not yet in a segment
+        self._finished_chars = 0
+        self._open = []  # Lines of the utterance still being spoken
+        self._speakers = {}
+        self._roles_checked = False
+
+    def add_lines(self, text):
+        """
+        Adds transcript text to the session.
+
+        Returns:
+            list: The segments closed by this text, in call order
+
+        Raises:
+            LiveSessionError: If the call is longer than /analyze accepts
+        """
+        self.total_chars += len(text)
+        if self.total_chars > MAX_TRANSCRIPT_LENGTH:
+            raise LiveSessionError('Transcript too large. Please use a shorter transcript.')
+
+        segments = []
+        for line in text.split('\n'):
+            if not line.strip():
+                continue
+            speaker, _ = parse_speaker_line(line)
+            if speaker is not None and self._open:
+                self._finish_utterance()
+                if self._finished_chars >= settings.LIVE_SEGMENT_CHARS:
+                    segments.append(self._take_segment())
+            self._open.append(line)
+        return segments
+
+    def flush(self):
+        """Closes everything not yet analysed, including the open utterance, as a segment. Returns it, or None."""
+        if self._open:
+            self._finish_utterance()
+        return self._take_segment() if self._finished else None
+
+    def _finish_utterance(self):
+        self._finished.extend(self._open)
+        self._finished_chars += sum(len(line) + 1 for line in self._open)
+        self._open = []
+
+    def _take_segment(self):
+        segment = '\n'.join(self._finished)
+        self._finished = []
+        self._finished_chars = 0
+        return segment
+
+    def precheck(self, segment):
+        """
+        Runs the local pre-checks that apply to a segment. Redaction is checked on
+        every segment; speaker roles once two speakers have been seen.
+
+        Returns:
+            str: The sentinel response that ends the session, or None
+        """
+        if not settings.PRECHECK_ENABLED:
+            return None
+        speakers, pii = scan_transcript(segment)
+        for words, count in speakers.items():
+            self._speakers[words] = self._speakers.get(words, 0) + count
+        if pii:
+            logging.info(f"Live pre-check: segment contains an unredacted {pii}")
+            return DATA_NOT_REDACTED_RESPONSE
+        if not self._roles_checked and len(self._speakers) >= MIN_SPEAKERS:
+            self._roles_checked = True
+            return check_speaker_roles(self._speakers, self.sales_rep_names, self.merchant_names)
+        return None
+
+    async def analyze_segment(self, segment):
+        """
+        Analyses one closed segment against the running summary.
+
+        Returns:
+            dict: {'segment': n, 'feedback': ..., 'model': ..., 'attempt': ...} on
+                  success, otherwise the result that ends the session (a sentinel
+                  reply or an error, shaped like an /analyze response)
+        """
+        with STAGE_SECONDS.labels(stage='precheck').time():
+            sentinel = self.precheck(segment)
+        if sentinel:
+            return sentinel_result(sentinel)
+        if not get_backend().is_configured():
+            logging.error("Gemini API key not configured.")
+            return {'error': 'AI service not configured. API key is missing.'}
+
+        number = len(self.findings) + 1
+        compacted, _ = compact_transcript(segment, self.sales_rep_names, self.merchant_names)
+        prompt = build_live_segment_suffix(compacted, number, self.summary, self.sales_rep_names, self.merchant_names)
+        deadline = Deadline(settings.LIVE_SEGMENT_TIMEOUT_SECONDS)
+        try:
+            with STAGE_SECONDS.labels(stage='upstream').time():
+                response, model_name, attempt = await hedged_generate_async(MODEL_NAME, prompt, deadline)
+        except Exception as e:
+            return exception_result(e, deadline)
+        record_token_usage(response, SYSTEM_PREFIX + prompt)
+
+        text = getattr(response, 'text', None)
+        sentinel, _ = match_sentinel(text or '')
+        if sentinel == DATA_NOT_REDACTED_RESPONSE:
+            return sentinel_result(sentinel)
+        if sentinel:
+            # Role and input checks concern the whole call, as in map_transcript_chunks
+            logging.warning(f"Live segment {number} answered {sentinel.split(':')[0]}, ignoring it")
+            self.findings.append(NO_SEGMENT_FINDINGS)
+            return {'segment': number, 'feedback': '', 'model': model_name, 'attempt': attempt}
+        if not text or not text.strip():
+            logging.error(f"Gemini API returned no content for live segment {number}")
+            return {'error': 'AI service returned no content for part of the transcript.'}
+
+        feedback, findings, summary = split_live_response(text)
+        self.findings.append(findings)
+        if summary:
+            self.summary = summary
+        return {'segment': number, 'feedback': feedback, 'model': model_name, 'attempt': attempt}
+
+    async def final_report(self):
+        """
+        Merges the findings of every segment into the full analysis, as /analyze
+        would return it for the whole call. Call after the last segment is analysed.
+        """
+        if len(self._speakers) < MIN_SPEAKERS and settings.PRECHECK_ENABLED:
+            return sentinel_result(UNSUPPORTED_INPUT_RESPONSE)
+        if not self.findings:
+            return {'error': 'No transcript provided.'}
+
+        prompt = build_merge_suffix(self.findings, self.sales_rep_names, self.merchant_names)
+        deadline = Deadline(settings.ANALYSIS_TIMEOUT_SECONDS)
+        try:
+            with STAGE_SECONDS.labels(stage='upstream').time():
+                response, model_name, attempt = await hedged_generate_async(MODEL_NAME, prompt, deadline)
+        except Exception as e:
+            return exception_result(e, deadline)
+        return response_result(response, prompt, model_name, attempt)
+
+async def analyse_segments(session, segments, send_event):
+    """
+    Analyses the session's closed segments one at a time, in call order, and
+    sends each update with send_event. Segments that close while an update is
+    in flight are analysed together next, so a fast talker never builds a
+    backlog of stale updates. A None in the queue marks the end of the call.
+
+    Returns:
+        dict: The result that ended the session early, or None once the queue is drained
+    """
+    ended = False
+    while not ended:
+        batch = [await segments.get()]
+        while not segments.empty():
+            batch.append(segments.get_nowait())
+        ended = None in batch
+        batch = [segment for segment in batch if segment is not None]
+        if not batch:
+            continue
+        if len(batch) > 1:
+            logging.info(f"Coalescing {len(batch)} live segments into one update")
+        result = await session.analyze_segment('\n'.join(batch))
+        if 'feedback' not in result:
+            return result
+        await send_event(dict(result, type='feedback'))
+    return None
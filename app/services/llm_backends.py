@@ -0,0 +1,261 @@
+import abc
+import asyncio
+import logging
+import math
+import random
+import threading
+import time
+
+from app.config import settings
+from app.services.prompts import SYSTEM_PREFIX, SENTINEL_RESPONSES, LIVE_SUMMARY_HEADING
+
+# Rough characters-per-token ratio used where no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+class LLMBackend(abc.ABC):
+    """
+    Interface analyze_transcript uses to reach a language model.
+
+    get_model returns an object whose generate_content(suffix, stream=False)
+    behaves like the SDK's: the static SYSTEM_PREFIX is implied, and the
+    response has a .text attribute (or, when streaming, is an iterable of
+    chunks that each have .text). generate_content_async(suffix) is the
+    awaitable equivalent used by the ASGI app.
+    """
+
+    name = None
+
+    @abc.abstractmethod
+    def is_configured(self):
+        """Return True if the backend can make calls (e.g. has an API key)."""
+
+    @abc.abstractmethod
+    def get_model(self, model_name):
+        """Return the model client for model_name."""
+
+    def stats(self):
+        """Return backend-specific counters."""
+        return {}
+
+    def warm_up(self, model_names):
+        """Load dependencies and build clients ahead of the first request."""
+
+class GeminiBackend(LLMBackend):
+    """The real Gemini API, through the long-lived clients in the model registry."""
+
+    name = 'gemini'
+
+    def is_configured(self):
+        return bool(settings.GEMINI_API_KEY)
+
+    def get_model(self, model_name):
+        from app.services.model_registry import get_model
+        return get_model(model_name)
+
+    def warm_up(self, model_names):
+        from app.services.model_registry import init_model_registry
+        init_model_registry(model_names)
+
+# Raised by the stub to simulate a failed upstream call
+class StubUpstreamError(Exception):
+    pass
+
+class StubResponse:
+    def __init__(self, text, usage_metadata=None):
+        self.text = text
+        self.prompt_feedback = None
+        self.usage_metadata = usage_metadata or {}
+
+STUB_ANALYSIS = """Final Score: 72/100 (Good)
+
+Category breakdown:
+• Funnel completion – 28/40
+• Pain discovery – 22/30
+• Commitments – 22/30
+
+Funnel summaries:
+### F1 (Complete)
+- Thinking: "How do payments affect your company goals?"
+- Explore: "When did this start happening?"
+- Narrow/Confirm: "If you fix this problem, will it help you to achieve your goal?"
+
+Aggregate lists (tagged):
+Pains:
+- "Checkout failures are costing us sales." [P1]
+Missed opportunities:
+- No Sweeper question before moving to next steps.
+
+Coaching tips:
+Close each funnel with a Sweeper such as "Is there anything else we should cover?"
+"""
+
+STUB_LIVE_UPDATE = """LIVE FEEDBACK:
+- Close the open funnel with a Narrow/Confirm question before moving on.
+
+SEGMENT FINDINGS:
+1. "How do payments affect your company goals?" (Thinking)
+2. F1 open: Thinking asked, no Explore yet
+3. "Checkout failures are costing us sales." (pain)
+
+RUNNING SUMMARY:
+One funnel open on checkout failures; one pain found, no commitments yet.
+"""
+
+def parse_latency(spec):
+    """
+    Parses a latency distribution spec into a sampling function.
+
+    Supported specs: "fixed:S", "uniform:LO,HI" and "lognormal:MU,SIGMA" (all in seconds).
+    """
+    kind, _, params = spec.partition(':')
+    values = [float(value) for value in params.split(',') if value.strip()]
+    if kind == 'fixed' and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == 'uniform' and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == 'lognormal' and len(values) == 2:
+        return lambda rng: rng.lognormvariate(values[0], values[1])
+    raise ValueError(f"Invalid stub latency spec: {spec!r}")
+
+class StubModel:
+    """Offline stand-in for a Gemini model; see StubBackend."""
+
+    def __init__(self, backend, model_name):
+        self.backend = backend
+        self.model_name = model_name
+
+    def generate_content(self, suffix, stream=False, **kwargs):
+        text, latency, usage = self.backend.plan_call(suffix)
+        if not stream:
+            time.sleep(latency)
+            return StubResponse(text, usage)
+        return self._stream(text, latency)
+
+    async def generate_content_async(self, suffix, **kwargs):
+        text, latency, usage = self.backend.plan_call(suffix)
+        await asyncio.sleep(latency)
+        return StubResponse(text, usage)
+
+    def _stream(self, text, latency):
+        # Spread the latency over the chunks so time-to-first-byte is realistic
+        chunk_count = max(1, min(settings.STUB_STREAM_CHUNKS, len(text)))
+        size = math.ceil(len(text) / chunk_count)
+        for start in range(0, len(text), size):
+            time.sleep(latency / chunk_count)
+            yield StubResponse(text[start:start + size])
+
+class StubBackend(LLMBackend):
+    """
+    Offline backend for benchmarks and CI.
+
+    Answers with a canned analysis after a latency drawn from STUB_LATENCY,
+    fails STUB_ERROR_RATE of calls, and answers STUB_SENTINEL_RATE of calls
+    with a random sentinel. A transcript containing "[[stub:NEED_SPEAKER_ROLES]]"
+    (or another sentinel key) always gets that sentinel. It also counts the
+    tokens that would have been sent, so prompt changes can be measured offline.
+    Like PromptModel on an SDK without cached content, every call is charged for
+    the static prefix unless STUB_PREFIX_CACHE emulates an upstream prefix cache.
+    """
+
+    name = 'stub'
+
+    def __init__(self, latency=None, error_rate=None, sentinel_rate=None, seed=None):
+        self._sample_latency = parse_latency(latency or settings.STUB_LATENCY)
+        self.error_rate = settings.STUB_ERROR_RATE if error_rate is None else error_rate
+        self.sentinel_rate = settings.STUB_SENTINEL_RATE if sentinel_rate is None else sentinel_rate
+        self._rng = random.Random(seed if seed is not None else settings.STUB_SEED)
+        self._lock = threading.Lock()
+        self._prefix_cached_until = 0
+        self._stats = {
+            'calls': 0,
+            'errors': 0,
+            'sentinels': 0,
+            'prompt_tokens': 0,
+            'cached_prefix_tokens': 0,
+            'output_tokens': 0,
+        }
+
+    def is_configured(self):
+        return True
+
+    def get_model(self, model_name):
+        return StubModel(self, model_name)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def plan_call(self, suffix):
+        """Decide the outcome of one call and account for its tokens. Returns (text, latency, usage)."""
+        with self._lock:
+            latency = max(0.0, self._sample_latency(self._rng))
+            roll = self._rng.random()
+            self._stats['calls'] += 1
+
+            # Emulate upstream prefix caching: the prefix is paid for once per cache lifetime
+            now = time.time()
+            prefix_tokens = estimate_tokens(SYSTEM_PREFIX)
+            cached_tokens = 0
+            if settings.PROMPT_CACHE_ENABLED and settings.STUB_PREFIX_CACHE:
+                if now < self._prefix_cached_until:
+                    cached_tokens, prefix_tokens = prefix_tokens, 0
+                else:
+                    self._prefix_cached_until = now + settings.PROMPT_CACHE_TTL_SECONDS
+            prompt_tokens = prefix_tokens + estimate_tokens(suffix)
+            self._stats['prompt_tokens'] += prompt_tokens
+            self._stats['cached_prefix_tokens'] += cached_tokens
+
+            if roll < self.error_rate:
+                self._stats['errors'] += 1
+                error = self._rng.choice(['429 Resource has been exhausted (e.g. check quota).',
+                                          '503 The service is currently unavailable.'])
+                raise StubUpstreamError(error)
+
+            text = next((sentinel for key, sentinel in SENTINEL_RESPONSES.items() if f'[[stub:{key}]]' in suffix), None)
+            if text is None and roll < self.error_rate + self.sentinel_rate:
+                text = self._rng.choice(list(SENTINEL_RESPONSES.values()))
+            if text is not None:
+                self._stats['sentinels'] += 1
+            elif LIVE_SUMMARY_HEADING in suffix:
+                text = STUB_LIVE_UPDATE
+            else:
+                text = STUB_ANALYSIS
+
+            output_tokens = estimate_tokens(text)
+            self._stats['output_tokens'] += output_tokens
+
+        usage = {
+            'prompt_token_count': prompt_tokens,
+            'cached_content_token_count': cached_tokens,
+            'candidates_token_count': output_tokens,
+        }
+        return text, latency, usage
+
+BACKENDS = {
+    GeminiBackend.name: GeminiBackend,
+    StubBackend.name: StubBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_backend():
+    """Return the process-wide backend selected by LLM_BACKEND."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend_class = BACKENDS.get(settings.LLM_BACKEND)
+                if backend_class is None:
+                    logging.warning(f"Unknown LLM_BACKEND '{settings.LLM_BACKEND}', using gemini")
+                    backend_class = GeminiBackend
+                _backend = backend_class()
+    return _backend
+
+def set_backend(backend):
+    """Replace the process-wide backend (e.g. with a StubBackend configured in code)."""
+    global _backend
+    _backend = backend
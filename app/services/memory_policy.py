@@ -0,0 +1,34 @@
+import gc
+import logging
+import time
+
+from app.config import settings
+from app.services.metrics import GC_SECONDS, RSS_BYTES, current_rss_bytes
+
+def after_analysis():
+    """
+    Applies the configured memory policy once an analysis has finished.
+
+    GC_POLICY chooses when to force a full collection:
+        none        - never; leave it to the interpreter
+        per_request - after every analysis (the old behaviour, minus the extra calls)
+        rss         - only when the process RSS is above GC_RSS_THRESHOLD_MB
+
+    Collections are timed into funnelbot_gc_seconds so the policy can be tuned
+    from real numbers.
+    """
+    policy = settings.GC_POLICY
+    if policy == 'none':
+        return
+
+    rss = current_rss_bytes()
+    RSS_BYTES.set(rss)
+    if policy == 'rss' and rss < settings.GC_RSS_THRESHOLD_MB * 1024 * 1024:
+        return
+    if policy not in ('per_request', 'rss'):
+        logging.warning(f"Unknown GC_POLICY '{policy}', not collecting")
+        return
+
+    started = time.perf_counter()
+    gc.collect()
+    GC_SECONDS.observe(time.perf_counter() - started)
@@ -0,0 +1,87 @@
+import os
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import multiprocess
+
+from app.services.llm_backends import estimate_tokens
+
+# Buckets sized for everything from sub-millisecond parsing to multi-minute upstream calls
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+STAGE_SECONDS = Histogram(
+    'funnelbot_stage_seconds', 'Time spent in each stage of an analysis request',
+    ['stage'], buckets=STAGE_BUCKETS)
+GC_SECONDS = Histogram(
+    'funnelbot_gc_seconds', 'Time spent in forced garbage collections',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1))
+RATE_LIMIT_WAIT_SECONDS = Histogram(
+    'funnelbot_rate_limit_wait_seconds', 'Time upstream calls waited for the client-side rate limiter',
+    buckets=(0, 0.01, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60))
+
+RETRIES = Counter('funnelbot_upstream_retries_total', 'Upstream calls retried after a failure')
+TIMEOUTS = Counter('funnelbot_timeouts_total', 'Analyses that ran out of time')
+TRUNCATIONS = Counter('funnelbot_truncations_total', 'Transcripts truncated to fit the prompt')
+SENTINELS = Counter('funnelbot_sentinel_responses_total', 'Sentinel replies returned instead of an analysis', ['sentinel'])
+UPSTREAM_REJECTED = Counter('funnelbot_upstream_rejected_total', 'Analyses refused while the upstream circuit breaker was open')
+HEDGED_ATTEMPTS = Counter('funnelbot_hedged_attempts_total', 'Extra upstream attempts started because the first was slow or failed', ['model'])
+ANSWERS = Counter('funnelbot_answers_total', 'Final upstream answers by the model and attempt that produced them', ['model', 'attempt'])
+PROMPT_TOKENS_TOTAL = Counter('funnelbot_prompt_tokens_total', 'Prompt tokens sent upstream')
+OUTPUT_TOKENS_TOTAL = Counter('funnelbot_output_tokens_total', 'Output tokens received from upstream')
+
+IN_FLIGHT = Gauge('funnelbot_in_flight_requests', 'Analysis requests currently being handled', multiprocess_mode='livesum')
+LIVE_SESSIONS = Gauge('funnelbot_live_sessions', 'Live-call WebSocket sessions currently open', multiprocess_mode='livesum')
+RSS_BYTES = Gauge('funnelbot_rss_bytes', 'Resident set size of this process', multiprocess_mode='liveall')
+CIRCUIT_OPEN = Gauge('funnelbot_upstream_circuit_open', '1 while the upstream circuit breaker is open', multiprocess_mode='liveall')
+PROMPT_TOKENS = Gauge('funnelbot_last_prompt_tokens', 'Prompt tokens sent with the most recent upstream call', multiprocess_mode='liveall')
+OUTPUT_TOKENS = Gauge('funnelbot_last_output_tokens', 'Output tokens in the most recent upstream response', multiprocess_mode='liveall')
+
+def current_rss_bytes():
+    """Resident set size of this process, or 0 where /proc is not available."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def token_usage(response, prompt_text):
+    """
+    Returns (prompt_tokens, output_tokens) for one upstream call.
+
+    Uses the response's usage metadata when the SDK or backend provides it,
+    and otherwise estimates from the text lengths.
+    """
+    usage = getattr(response, 'usage_metadata', None)
+    prompt_tokens = output_tokens = None
+    if usage:
+        get = usage.get if isinstance(usage, dict) else lambda name: getattr(usage, name, None)
+        prompt_tokens = get('prompt_token_count')
+        output_tokens = get('candidates_token_count')
+    if prompt_tokens is None:
+        prompt_tokens = estimate_tokens(prompt_text)
+    if output_tokens is None:
+        output_tokens = estimate_tokens(getattr(response, 'text', '') or '')
+    return prompt_tokens, output_tokens
+
+def record_token_usage(response, prompt_text):
+    """Records prompt and output token counts for one upstream call, as token_usage counts them."""
+    record_token_counts(*token_usage(response, prompt_text))
+
+def record_token_counts(prompt_tokens, output_tokens):
+    """Records prompt and output token counts for one upstream call."""
+    PROMPT_TOKENS.set(prompt_tokens)
+    OUTPUT_TOKENS.set(output_tokens)
+    PROMPT_TOKENS_TOTAL.inc(prompt_tokens)
+    OUTPUT_TOKENS_TOTAL.inc(output_tokens)
+
+def render_metrics():
+    """
+    Returns (body, content_type) for the /metrics endpoint.
+
+    With several gunicorn workers, set PROMETHEUS_MULTIPROC_DIR so the
+    metrics of all workers are aggregated instead of reporting one worker.
+    """
+    RSS_BYTES.set(current_rss_bytes())
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
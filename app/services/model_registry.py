@@ -0,0 +1,137 @@
+import datetime
+import logging
+import threading
+import time
+
+from app.config import settings
+from app.services.prompts import SYSTEM_PREFIX, SYSTEM_PREFIX_VERSION
+
+# Use a more optimized model configuration with lower temperature for memory efficiency
+DEFAULT_GENERATION_CONFIG = {
+    'temperature': 0,
+    'top_p': 0.1,
+    'max_output_tokens': 5000,  # Reduced output size
+}
+
+# How long to wait before trying to create the prefix cache again after a failure
+PREFIX_CACHE_RETRY_SECONDS = 600
+
+_sdk = None
+_sdk_lock = threading.Lock()
+
+def load_sdk():
+    """
+    Imports and configures google.generativeai on first use.
+
+    The SDK and its gRPC stack are the slowest part of starting the app, so
+    they are loaded when the first model client is built - at warm-up or on
+    the first request - rather than when the app is imported.
+    """
+    global _sdk
+    if _sdk is None:
+        with _sdk_lock:
+            if _sdk is None:
+                import google.generativeai as genai
+                if settings.GEMINI_API_KEY:
+                    genai.configure(api_key=settings.GEMINI_API_KEY)
+                _sdk = genai
+    return _sdk
+
+class PromptModel:
+    """
+    Long-lived Gemini model bound to the static SYSTEM_PREFIX.
+
+    Callers pass only the per-request prompt suffix. When the SDK supports
+    cached content, the prefix is uploaded once as a cached system instruction
+    and reused until it expires; otherwise it is sent inline before the suffix.
+    """
+
+    def __init__(self, model_name, generation_config=None):
+        genai = load_sdk()
+        self.model_name = model_name
+        self.generation_config = genai.GenerationConfig(**(generation_config or DEFAULT_GENERATION_CONFIG))
+        self._model = genai.GenerativeModel(model_name, generation_config=self.generation_config)
+        self._cached_model = None
+        self._cache_expires_at = 0
+        self._cache_retry_at = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, suffix, **kwargs):
+        """Generate a response to SYSTEM_PREFIX + suffix."""
+        cached_model = self._prefix_cached_model()
+        if cached_model is not None:
+            return cached_model.generate_content(suffix, **kwargs)
+        return self._model.generate_content(SYSTEM_PREFIX + suffix, **kwargs)
+
+    async def generate_content_async(self, suffix, **kwargs):
+        """Async version of generate_content, using the SDK's async client."""
+        cached_model = self._prefix_cached_model()
+        if cached_model is not None:
+            return await cached_model.generate_content_async(suffix, **kwargs)
+        return await self._model.generate_content_async(SYSTEM_PREFIX + suffix, **kwargs)
+
+    @property
+    def prefix_cached(self):
+        return self._cached_model is not None and time.time() < self._cache_expires_at
+
+    def _prefix_cached_model(self):
+        genai = load_sdk()
+        if not settings.PROMPT_CACHE_ENABLED or not hasattr(genai, 'caching'):
+            return None
+        now = time.time()
+        if self._cached_model is not None and now < self._cache_expires_at - 60:
+            return self._cached_model
+        if now < self._cache_retry_at:
+            return None
+
+        with self._lock:
+            if self._cached_model is not None and time.time() < self._cache_expires_at - 60:
+                return self._cached_model
+            ttl = settings.PROMPT_CACHE_TTL_SECONDS
+            try:
+                cached_content = genai.caching.CachedContent.create(
+                    model=self.model_name if self.model_name.startswith('models/') else f'models/{self.model_name}',
+                    display_name=SYSTEM_PREFIX_VERSION,
+                    system_instruction=SYSTEM_PREFIX,
+                    ttl=datetime.timedelta(seconds=ttl),
+                )
+                self._cached_model = genai.GenerativeModel.from_cached_content(
+                    cached_content, generation_config=self.generation_config)
+                self._cache_expires_at = time.time() + ttl
+                logging.info(f"Cached prompt prefix '{SYSTEM_PREFIX_VERSION}' for {self.model_name}")
+            except Exception as e:
+                logging.warning(f"Could not cache prompt prefix for {self.model_name}, sending it inline: {e}")
+                self._cached_model = None
+                self._cache_retry_at = time.time() + PREFIX_CACHE_RETRY_SECONDS
+            return self._cached_model
+
+class ModelRegistry:
+    """Process-wide registry of PromptModel clients, one per model name."""
+
+    def __init__(self):
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_name):
+        model = self._models.get(model_name)
+        if model is None:
+            with self._lock:
+                model = self._models.get(model_name)
+                if model is None:
+                    model = self._models[model_name] = PromptModel(model_name)
+        return model
+
+_registry = ModelRegistry()
+
+def init_model_registry(model_names):
+    """
+    Builds the model clients up front. Called from the warm-up hook, so with
+    gunicorn's --preload the clients are created once in the master and inherited
+    by the workers; the SDK only opens its connection on the first request.
+    """
+    for model_name in model_names:
+        _registry.get(model_name)
+
+def get_model(model_name):
+    """Return the long-lived client for model_name."""
+    return _registry.get(model_name)
@@ -0,0 +1,133 @@
+import logging
+import re
+
+from app.services.prompts import NEED_SPEAKER_ROLES_RESPONSE, DATA_NOT_REDACTED_RESPONSE, UNSUPPORTED_INPUT_RESPONSE
+from app.services.transcript import parse_speaker_line
+
+# Speaker labels longer than this are treated as prose that happens to contain a colon
+MAX_SPEAKER_WORDS = 5
+
+# A transcript needs at least this many distinct speakers to be scored
+MIN_SPEAKERS = 2
+
+# Separators allowed inside names lists such as "Alice, Bob and Carol"
+NAME_SEPARATOR_RE = re.compile(r'\s*(?:,|;|/|&|\band\b)\s*', re.IGNORECASE)
+WORD_RE = re.compile(r'[^\W_]+')
+
+# Digit groupings of phone numbers written without a leading +, ( or 0: 555-123-4567, 1-800-555-1234
+PHONE_GROUPINGS = ([3, 3, 4], [1, 3, 3, 4])
+
+# Emails, and runs of digits with the separators used in card and phone numbers. Dots are
+# excluded from number runs so amounts, versions and IP addresses are not flagged.
+PII_RE = re.compile(
+    r'(?P<email>[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,})'
+    r'|(?P<number>\+?\(?\d(?:[ ()-]{0,2}\d){8,18})'
+)
+
+def luhn_valid(digits):
+    """Return True if the digit string passes the Luhn checksum used by card numbers."""
+    total = 0
+    for position, digit in enumerate(reversed(digits)):
+        value = int(digit)
+        if position % 2:
+            value *= 2
+            if value > 9:
+                value -= 9
+        total += value
+    return total % 10 == 0
+
+def classify_number(text):
+    """
+    Classifies a run of digits found in a transcript.
+
+    Returns:
+        str: 'card' for a 13-19 digit Luhn-valid number, 'phone' for a 10-15 digit
+             number written like a phone number (leading +, ( or 0, or grouped as in
+             PHONE_GROUPINGS), or None. Other numbers, such as years, ranges and
+             reference numbers, are left to the model.
+    """
+    digits = re.sub(r'\D', '', text)
+    if 13 <= len(digits) <= 19 and luhn_valid(digits):
+        return 'card'
+    groups = [len(group) for group in re.findall(r'\d+', text)]
+    if 10 <= len(digits) <= 15 and (text[0] in '+(0' or groups in PHONE_GROUPINGS):
+        return 'phone'
+    return None
+
+def split_names(names):
+    """Splits a names field such as "Alice, Bob and Carol" into normalised word tuples."""
+    return [tuple(WORD_RE.findall(name.casefold())) for name in NAME_SEPARATOR_RE.split(names or '')
+            if WORD_RE.search(name)]
+
+def name_matches(name_words, speaker_words):
+    """A name matches a speaker label when all the words of one appear in the other ("Alice" / "Alice Smith (Rep)")."""
+    return set(name_words) <= set(speaker_words) or set(speaker_words) <= set(name_words)
+
+def scan_transcript(transcript):
+    """
+    Collects what the pre-check needs in one pass over the transcript lines.
+
+    Returns:
+        tuple: (speakers, pii) - speakers maps each plausible speaker label's normalised
+               words to its number of lines; pii is the kind of the first personal data
+               found ('email', 'card' or 'phone'), or None
+    """
+    speakers = {}
+    pii = None
+    for line in transcript.split('\n'):
+        speaker, _ = parse_speaker_line(line)
+        if speaker is not None:
+            words = tuple(WORD_RE.findall(speaker.casefold()))
+            if words and len(words) <= MAX_SPEAKER_WORDS and not all(word.isdigit() for word in words):
+                speakers[words] = speakers.get(words, 0) + 1
+        if pii is None:
+            for match in PII_RE.finditer(line):
+                pii = 'email' if match.group('email') else classify_number(match.group('number'))
+                if pii:
+                    break
+    return speakers, pii
+
+def precheck_transcript(transcript, sales_rep_names, merchant_names):
+    """
+    Local pre-check that catches bad submissions before any API call.
+
+    Applies the prompt's input rules that can be decided without the model:
+    the input must be a transcript with speaker lines, must not contain card
+    numbers, emails or phone numbers, and no speaker may be named as both a
+    sales rep and a merchant. Only clear failures are reported; anything
+    borderline, such as names that match no speaker label, is left to the model.
+
+    Returns:
+        str: The sentinel response the model would have given, or None if the transcript passes
+    """
+    speakers, pii = scan_transcript(transcript)
+
+    if len(speakers) < MIN_SPEAKERS:
+        logging.info(f"Pre-check: {len(speakers)} speaker(s) found, input is not a transcript")
+        return UNSUPPORTED_INPUT_RESPONSE
+
+    if pii:
+        logging.info(f"Pre-check: transcript contains an unredacted {pii}")
+        return DATA_NOT_REDACTED_RESPONSE
+
+    return check_speaker_roles(speakers, sales_rep_names, merchant_names)
+
+def check_speaker_roles(speakers, sales_rep_names, merchant_names):
+    """
+    Checks the named sales reps and merchants against the speakers found by scan_transcript.
+
+    Only a definite clash is reported: a speaker matching both a rep and a merchant
+    name. Names that match no speaker ("Dan" for "Daniel", or "Rep:" / "Customer:"
+    labels) are left to the model, which can usually tell the roles apart.
+
+    Returns:
+        str: NEED_SPEAKER_ROLES_RESPONSE if the roles clash, otherwise None
+    """
+    reps = split_names(sales_rep_names)
+    merchants = split_names(merchant_names)
+    rep_speakers = {speaker for speaker in speakers if any(name_matches(name, speaker) for name in reps)}
+    merchant_speakers = {speaker for speaker in speakers if any(name_matches(name, speaker) for name in merchants)}
+    if rep_speakers & merchant_speakers:
+        logging.info("Pre-check: a speaker matches both a sales rep and a merchant name")
+        return NEED_SPEAKER_ROLES_RESPONSE
+    return None
@@ -0,0 +1,226 @@
+# Version of the rubric below; part of the result cache key, so bump it whenever the prompt changes
+PROMPT_VERSION = "Funnel‑Coach‑Gem v1‑2025‑05‑21 (Rev 7)"
+
+# Version of the SYSTEM_PREFIX / suffix layout; bump whenever either changes
+PROMPT_LAYOUT_VERSION = 3
+SYSTEM_PREFIX_VERSION = f"{PROMPT_VERSION} prefix v{PROMPT_LAYOUT_VERSION}"
+
+# Canned replies the prompt instructs the model to give instead of an analysis
+NEED_SPEAKER_ROLES_RESPONSE = "NEED_SPEAKER_ROLES: Please specify which speaker(s) is/are the sales rep(s) and which is/are the merchant(s) so I can evaluate the call."
+DATA_NOT_REDACTED_RESPONSE = "DATA_NOT_REDACTED"
+UNSUPPORTED_INPUT_RESPONSE = "UNSUPPORTED_INPUT"
+
+SENTINEL_RESPONSES = {
+    'NEED_SPEAKER_ROLES': NEED_SPEAKER_ROLES_RESPONSE,
+    'DATA_NOT_REDACTED': DATA_NOT_REDACTED_RESPONSE,
+    'UNSUPPORTED_INPUT': UNSUPPORTED_INPUT_RESPONSE,
+}
+
+# Static system prefix: the role, funnel-technique rubric and style rules shared by every
+# analysis prompt. It contains nothing request-specific, so it can be cached upstream once
+# and only the small per-request suffix is sent with each call.
+SYSTEM_PREFIX = """# Funnel‑Coach‑Gem v1‑2025‑05‑21 (Rev 7)‑explore‑100pt (Explore‑stage calls)
+
+## ROLE
+
+You are a revenue‑enablement coach. As a revenue‑enablement coach, your evaluation of these Explore‑stage calls is critical because this stage is designed to build trust, thoroughly understand the merchant's business, establish their needs and wants, identify barriers, and ultimately gain the merchant's acceptance of requirements. Evaluate **Explore‑stage** sales‑call transcripts for:
+
+* Effective use of the **funneling technique**
+* How thoroughly the seller uncovers **pains**, **motivations**, and secures **commitments**
+
+---
+
+## 1 Pre‑check: Speaker roles
+
+**Inspect the speaker labels first.** The user's input names the sales rep(s) and merchant(s) alongside the transcript ("Sales Rep(s) indicated as" and "Merchant(s) indicated as").
+
+If it is **not explicitly clear** from the transcript who the sales‑rep(s) is/are and who the merchant(s) is/are, even with this information:
+
+1. **Do NOT score the call.**
+2. Respond **exactly** with:
+
+```
+NEED_SPEAKER_ROLES: Please specify which speaker(s) is/are the sales rep(s) and which is/are the merchant(s) so I can evaluate the call.
+```
+
+3. Wait for clarification, then continue.
+
+Only proceed once roles are unambiguous.
+
+---
+
+## 2 Funneling technique definition
+
+The funnel technique progresses from broad to specific: starting with Thinking questions (Triggers), moving to multiple Explore questions to gather details, then to Narrow/Confirm questions to verify understanding, and often concluding with a Sweeper question.
+
+| Stage                | Purpose & Typical Use                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                           | Typical form                                                                                       |
+| -------------------- | ------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------- | -------------------------------------------------------------------------------------------------- |
+| **Thinking**         | Wide and unbiased questions that will result in long answers. Normally used to start a new funnel or to provoke thinking during an existing funnel.                                                                                                                                                                                                                                                                                                                                                                             | Open "How/Why" question (e.g., "How do payments affect your company goals?")                       |
+|                      | **Non-Examples / Common Pitfalls for Thinking Questions:**  - A question that primarily seeks factual recall (e.g., "What system do you use?") is typically Explore, not Thinking.  - A question that is very narrow or seeks a yes/no answer is likely Narrow/Confirm.                                                                                                                                                                                                                                                         |                                                                                                    |
+| **Explore (broad)**  | In response to a trigger, in‑order to learn more about a topic. Normally used to drill deeper during an existing funnel, or to start a new funnel in response to a trigger.                                                                                                                                                                                                                                                                                                                                                     | Who, what, when, where, why, which, how (e.g., "When did this start happening?")                   |
+|                      | **Non-Examples / Common Pitfalls for Explore Questions:**  - A simple statement like 'That's interesting' or 'Tell me more' (without a question mark or interrogative structure) is not an Explore question. It must be phrased as a question.  - A question that is primarily seeking a yes/no answer to validate information (e.g., 'So, you're saying X is the main issue?') is a Narrow/Confirm question.                                                                                                                   |                                                                                                    |
+| **Narrow / Confirm** | Narrow questions to confirm something. Normally used at the end of funnels, or if there is no need for a funnel, in response to something said by the customer.                                                                                                                                                                                                                                                                                                                                                                 | If / do / is / are style (e.g., "If you fix this problem, will it help you to achieve your goal?") |
+|                      | **Non-Examples / Common Pitfalls for Narrow/Confirm Questions:**  - An open‑ended question like 'What are your thoughts on that solution?' is likely Thinking or Explore, not Narrow/Confirm. Narrow/Confirm questions are typically closed‑ended and seek specific validation of information already discussed.  - Simply repeating a merchant's statement as a statement (e.g., "So, APMs are costing you sales.") is not a Narrow/Confirm question unless phrased interrogatively (e.g., "So, are APMs costing you sales?"). |                                                                                                    |
+| **Sweeper**          | Surface anything missed or summarise problem/next steps.                                                                                                                                                                                                                                                                                                                                                                                                                                                                        | "Is there anything else we should cover?" / summary statement                                      |
+|                      | **Non-Examples / Common Pitfalls for Sweeper Questions:**  - A question that introduces a completely new topic is likely a Thinking question, not a Sweeper.  - A generic closing like "Thanks for your time" is not a Sweeper question/statement for scoring purposes unless it also explicitly asks if anything was missed or summarises.                                                                                                                                                                                     |                                                                                                    |
+
+**Classification rules:**
+
+1. *Each seller utterance can belong to **one and only one** question category (Thinking, Explore, Narrow/Confirm, or Sweeper). Never double‑classify the same question.*
+2. *If an utterance contains **two or more distinct questions**, classify the **first interrogative clause** only; ignore the rest for scoring.*
+
+A **successful (complete) funnel** = **Thinking ➜ Explore ➜ ≥ 1 Narrow/Confirm** question asked by the **sales rep**.
+
+---
+
+## 3 Input assumptions
+
+* Transcript is plain text.
+* Each line begins with a speaker name followed by a colon (e.g., `Alice:`).
+* Timestamps like `[00:03:21]` are optional.
+* **No un‑redacted card data or personal identifiers.** If detected, respond exactly with `DATA_NOT_REDACTED`.
+
+---
+
+## 6 Style rules
+
+* Quote all utterances verbatim in bullet lists.
+* Use **British spelling**.
+* Never fabricate dialogue.
+* If transcript exceeds context length, analyse the earliest portion that contains at least the first two complete funnels if possible, or up to the first 15 rep utterances if two funnels aren't present that early.
+* If the input is not a transcript or is nonsensical, respond `UNSUPPORTED_INPUT`.
+
+---
+
+## Version tag
+
+`Funnel‑Coach‑Gem v1‑2025‑05‑21 (Rev 7)‑explore‑100pt`
+
+---
+
+"""
+
+def build_transcript_section(transcript, sales_rep_names, merchant_names):
+    """Builds the prompt section that carries the (possibly partial) transcript."""
+    return f"""## CALL TRANSCRIPT TO ANALYZE:
+
+Sales Rep(s) indicated as: {sales_rep_names}
+Merchant(s) indicated as: {merchant_names}
+
+```text
+{transcript}
+```
+
+"""
+
+ANALYSIS_INSTRUCTIONS = """## ANALYSIS AND EVALUATION:
+(Begin your analysis here, focusing only on identifying the basic question types and funnels. Due to space constraints, provide a simplified analysis with these key elements:)
+1. Identify the main question types (Thinking, Explore, Narrow/Confirm, Sweeper)
+2. Find complete funnels following the Thinking → Explore → Narrow/Confirm pattern
+3. Note any significant pains articulated by the merchant
+4. Provide a brief score estimation
+
+Keep your response concise and under 2000 words.
+"""
+
+def build_request_suffix(transcript, sales_rep_names, merchant_names):
+    """
+    Builds the per-request part of the Funnel-Coach prompt, sent after SYSTEM_PREFIX.
+
+    Args:
+        transcript (str): The transcript to analyze
+        sales_rep_names (str): Names of sales representatives
+        merchant_names (str): Names of merchants
+
+    Returns:
+        str: The prompt suffix to send to Gemini
+    """
+    return build_transcript_section(transcript, sales_rep_names, merchant_names) + ANALYSIS_INSTRUCTIONS
+
+def build_prompt(transcript, sales_rep_names, merchant_names):
+    """Builds the full Funnel-Coach prompt for a transcript, as the model sees it."""
+    return SYSTEM_PREFIX + build_request_suffix(transcript, sales_rep_names, merchant_names)
+
+def build_segment_suffix(segment, segment_number, segment_count, sales_rep_names, merchant_names):
+    """
+    Builds the map-stage prompt suffix for one segment of a long transcript.
+
+    The model extracts findings from the segment without scoring it; the
+    findings of all segments are merged by build_merge_suffix.
+    """
+    return (build_transcript_section(segment, sales_rep_names, merchant_names)
+            + f"""## SEGMENT FINDINGS:
+This is segment {segment_number} of {segment_count} of a longer call. The other segments are analysed separately and all findings are merged afterwards, so **do not score the call**.
+Check this segment for un-redacted card data or personal identifiers as above. The speaker-role and input checks apply to the whole call and have already passed, so never reply `NEED_SPEAKER_ROLES` or `UNSUPPORTED_INPUT` for a segment, even one in which only one side speaks. Follow the style rules above, then list concisely:
+1. Every sales-rep question in this segment, quoted verbatim, with its category (Thinking, Explore, Narrow/Confirm, Sweeper)
+2. The funnels in this segment, noting any that appear to start before the segment begins or continue after it ends
+3. Significant pains, motivations and commitments articulated by the merchant, quoted verbatim
+
+Keep your response concise and under 800 words.
+""")
+
+# Stands in for the findings of a segment the model would not analyse on its own
+NO_SEGMENT_FINDINGS = "(No findings for this segment.)"
+
+def build_merge_suffix(segment_findings, sales_rep_names, merchant_names):
+    """
+    Builds the reduce-stage prompt suffix that merges per-segment findings into one report.
+
+    Args:
+        segment_findings (list): The map-stage response text for each segment, in call order
+        sales_rep_names (str): Names of sales representatives
+        merchant_names (str): Names of merchants
+
+    Returns:
+        str: The prompt suffix for the final, whole-call analysis
+    """
+    segment_count = len(segment_findings)
+    findings = '\n\n'.join(f"### Segment {number} of {segment_count}\n\n{text.strip()}"
+                           for number, text in enumerate(segment_findings, start=1))
+    return f"""## SEGMENT FINDINGS TO MERGE:
+
+The call was split into {segment_count} consecutive segments at speaker boundaries (because it was too long to analyse in one pass, or because it was analysed live while it happened) and each segment was analysed separately.
+The speaker-role and redaction pre-checks have already passed for every segment; do not repeat them.
+Merge the findings below into a single evaluation of the whole call. A funnel that spans a segment boundary counts once. Quote only utterances that appear in the findings.
+
+Sales Rep(s) indicated as: {sales_rep_names}
+Merchant(s) indicated as: {merchant_names}
+
+{findings}
+
+""" + ANALYSIS_INSTRUCTIONS
+
+# Section headings the live-segment response is split on
+LIVE_FEEDBACK_HEADING = "LIVE FEEDBACK:"
+LIVE_FINDINGS_HEADING = "SEGMENT FINDINGS:"
+LIVE_SUMMARY_HEADING = "RUNNING SUMMARY:"
+
+def build_live_segment_suffix(segment, segment_number, running_summary, sales_rep_names, merchant_names):
+    """
+    Builds the prompt suffix for one newly closed segment of a live call.
+
+    Only the new segment and a compact summary of the call so far are sent, so
+    the cost of each update stays flat however long the call runs. The response
+    has three headed sections: feedback for the rep now, findings for the final
+    merge (as in build_segment_suffix), and the updated running summary.
+    """
+    summary = running_summary.strip() if running_summary else "(This is the start of the call.)"
+    return (build_transcript_section(segment, sales_rep_names, merchant_names)
+            + f"""## LIVE CALL UPDATE:
+This is segment {segment_number} of a call that is still in progress; the earlier segments were analysed already and are summarised here:
+
+{summary}
+
+**Do not score the call.** Check this segment for un-redacted card data or personal identifiers as above. The speaker-role and input checks apply to the whole call, so never reply `NEED_SPEAKER_ROLES` or `UNSUPPORTED_INPUT` for a segment, even one in which only one side speaks. Follow the style rules above, then reply with exactly these three sections:
+
+{LIVE_FEEDBACK_HEADING}
+At most three short bullet points of coaching the sales rep can act on right now, e.g. a funnel to close with a Narrow/Confirm question or a pain to explore further.
+
+{LIVE_FINDINGS_HEADING}
+1. Every sales-rep question in this segment, quoted verbatim, with its category (Thinking, Explore, Narrow/Confirm, Sweeper)
+2. The funnels in this segment, noting any that continue from earlier segments or are still open
+3. Significant pains, motivations and commitments articulated by the merchant, quoted verbatim
+
+{LIVE_SUMMARY_HEADING}
+An updated summary of the whole call so far, under 200 words: funnels completed and still open, pains and commitments found.
+""")
@@ -0,0 +1,192 @@
+import os
+import json
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from app.config import settings
+
+def normalise_transcript(transcript):
+    """Normalise line endings and surrounding whitespace so trivially different pastes share a cache entry."""
+    lines = transcript.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return '\n'.join(line.rstrip() for line in lines).strip()
+
+def cache_key(transcript, sales_rep_names, merchant_names, model_name, prompt_version):
+    """
+    Builds the content address of an analysis.
+
+    Returns:
+        str: SHA-256 hex digest of everything that determines the model's answer
+    """
+    parts = [
+        normalise_transcript(transcript),
+        ' '.join(str(sales_rep_names).split()),
+        ' '.join(str(merchant_names).split()),
+        model_name,
+        prompt_version,
+    ]
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def is_cacheable(result):
+    """Only successful analyses are cached - never error dicts or sentinel replies."""
+    return bool(result) and 'error' not in result and not result.get('is_error') and bool(result.get('analysis_text'))
+
+class AnalysisCache:
+    """
+    Two-tier cache of analysis results.
+
+    A bounded in-memory LRU sits in front of an optional SQLite database that
+    is shared by all worker processes. Entries in both tiers expire after
+    ttl_seconds. Each entry remembers how long the upstream call took and how
+    many prompt and output tokens it was charged, so the hit counters can
+    report the API time and cost they saved.
+    """
+
+    def __init__(self, max_entries, db_path=None, ttl_seconds=7 * 24 * 3600):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()  # key -> (result, elapsed_seconds, created_at, prompt_tokens, output_tokens)
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_pid = None
+        self._stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'saved_seconds': 0.0,
+            'saved_prompt_tokens': 0,
+            'saved_output_tokens': 0,
+        }
+
+    def get(self, key):
+        """Return the cached result for key, or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and now - entry[2] <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self._record_hit('memory_hits', entry)
+                return dict(entry[0])
+            if entry:
+                del self._memory[key]
+
+            entry = self._disk_get(key, now)
+            if entry:
+                self._memory_put(key, entry)
+                self._record_hit('disk_hits', entry)
+                return dict(entry[0])
+
+            self._stats['misses'] += 1
+            return None
+
+    def put(self, key, result, elapsed_seconds, prompt_tokens=0, output_tokens=0):
+        """Store a successful result along with the upstream time and tokens it took to produce."""
+        if not is_cacheable(result):
+            return
+        entry = (dict(result), elapsed_seconds, time.time(), prompt_tokens, output_tokens)
+        with self._lock:
+            self._memory_put(key, entry)
+            self._disk_put(key, entry)
+            self._stats['stores'] += 1
+
+    def stats(self):
+        """Return hit/miss counters and the upstream time and tokens saved by cache hits."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._memory)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_ratio'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        stats['disk_enabled'] = bool(self.db_path)
+        return stats
+
+    def _record_hit(self, counter, entry):
+        # Caller must hold self._lock
+        _, elapsed, _, prompt_tokens, output_tokens = entry
+        self._stats[counter] += 1
+        self._stats['saved_seconds'] += elapsed
+        self._stats['saved_prompt_tokens'] += prompt_tokens
+        self._stats['saved_output_tokens'] += output_tokens
+
+    def _memory_put(self, key, entry):
+        # Caller must hold self._lock
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _connection(self):
+        # Caller must hold self._lock. Connections are not shared across forked workers.
+        if not self.db_path:
+            return None
+        if self._db is None or self._db_pid != os.getpid():
+            self._db = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS analysis_cache ('
+                'key TEXT PRIMARY KEY, result TEXT NOT NULL, elapsed REAL NOT NULL, created_at REAL NOT NULL, '
+                'prompt_tokens INTEGER NOT NULL DEFAULT 0, output_tokens INTEGER NOT NULL DEFAULT 0)'
+            )
+            # Databases created before token counts were stored lack their columns
+            for column in ('prompt_tokens', 'output_tokens'):
+                try:
+                    self._db.execute(f'ALTER TABLE analysis_cache ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0')
+                except sqlite3.OperationalError:
+                    pass  # Already there
+            self._db.commit()
+            self._db_pid = os.getpid()
+        return self._db
+
+    def _disk_get(self, key, now):
+        # Caller must hold self._lock
+        try:
+            db = self._connection()
+            if db is None:
+                return None
+            row = db.execute('SELECT result, elapsed, created_at, prompt_tokens, output_tokens FROM analysis_cache '
+                             'WHERE key = ?', (key,)).fetchone()
+            if not row:
+                return None
+            if now - row[2] > self.ttl_seconds:
+                db.execute('DELETE FROM analysis_cache WHERE key = ?', (key,))
+                db.commit()
+                return None
+            return (json.loads(row[0]),) + tuple(row[1:])
+        except sqlite3.Error as e:
+            logging.warning(f"Analysis cache read failed: {e}")
+            return None
+
+    def _disk_put(self, key, entry):
+        # Caller must hold self._lock
+        try:
+            db = self._connection()
+            if db is None:
+                return
+            result, elapsed, created_at, prompt_tokens, output_tokens = entry
+            db.execute('INSERT OR REPLACE INTO analysis_cache (key, result, elapsed, created_at, prompt_tokens, '
+                       'output_tokens) VALUES (?, ?, ?, ?, ?, ?)',
+                       (key, json.dumps(result), elapsed, created_at, prompt_tokens, output_tokens))
+            # Evict expired rows while we are writing anyway
+            db.execute('DELETE FROM analysis_cache WHERE created_at < ?', (created_at - self.ttl_seconds,))
+            db.commit()
+        except sqlite3.Error as e:
+            logging.warning(f"Analysis cache write failed: {e}")
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+def get_result_cache():
+    """Return this process's analysis cache, creating it on first use."""
+    global _result_cache
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                _result_cache = AnalysisCache(settings.CACHE_MAX_ENTRIES, settings.CACHE_DB_PATH or None,
+                                              settings.CACHE_TTL_SECONDS)
+    return _result_cache
@@ -0,0 +1,39 @@
+import re
+
+# A transcript line that starts a new utterance: optional timestamp, bracketed ("[00:03:21]")
+# or not ("00:03:21 "), then "Speaker:"
+SPEAKER_LINE_RE = re.compile(r'^\s*(?:\[(?P<timestamp>\d{1,2}:\d{2}(?::\d{2})?)\]\s*'
+                             r'|(?P<bare_timestamp>\d{1,2}:\d{2}(?::\d{2})?)\s+)?'
+                             r'(?P<speaker>[^:\[\]\n]{1,60}?)\s*:(?P<text>.*)$')
+
+def parse_speaker_line(line):
+    """
+    Splits a transcript line into its speaker and text.
+
+    Returns:
+        tuple: (speaker, text) for a speaker line, or (None, line) for a continuation line
+    """
+    match = SPEAKER_LINE_RE.match(line)
+    # A label of digits alone is part of a time or number ("10:30"), not a speaker
+    if not match or not match.group('speaker').strip() or match.group('speaker').strip().isdigit():
+        return None, line
+    return match.group('speaker').strip(), match.group('text').strip()
+
+def split_utterances(text):
+    """
+    Groups transcript lines into utterances.
+
+    Each utterance starts at a speaker line and includes any following lines
+    that do not start with a speaker label (wrapped or multi-line speech).
+
+    Returns:
+        list: Lists of lines, one per utterance
+    """
+    utterances = []
+    for line in text.split('\n'):
+        speaker, _ = parse_speaker_line(line)
+        if speaker is not None or not utterances:
+            utterances.append([line])
+        else:
+            utterances[-1].append(line)
+    return utterances
@@ -0,0 +1,229 @@
+import logging
+import random
+import re
+import sys
+import threading
+import time
+
+from app.config import settings
+from app.services.deadline import TimeoutException, DeadlineCancelled
+from app.services.metrics import RETRIES, CIRCUIT_OPEN, RATE_LIMIT_WAIT_SECONDS
+
+RETRYABLE = 'retryable'
+FATAL = 'fatal'
+
+# HTTP statuses worth retrying: rate limited, server errors and upstream deadline
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# A status code as the first word of an error message ("503 The service is currently unavailable.")
+LEADING_STATUS_RE = re.compile(r'\s*(\d{3})\b')
+
+RETRYABLE_MESSAGES = ('resource has been exhausted', 'quota', 'unavailable', 'deadline exceeded',
+                      'timed out', 'internal error')
+
+# Raised instead of calling upstream while the circuit breaker is open
+class UpstreamUnavailable(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Upstream unavailable; retry after {retry_after} seconds")
+        self.retry_after = retry_after
+
+def classify_error(error):
+    """
+    Sorts an upstream error into RETRYABLE (rate limits, 5xx, upstream deadline,
+    connection problems) or FATAL (bad key, invalid request, safety block, anything unknown).
+    """
+    # Only look for the SDK's exception types if it is loaded; importing it here would slow startup
+    google_exceptions = sys.modules.get('google.api_core.exceptions')
+    if google_exceptions is not None:
+        if isinstance(error, google_exceptions.GoogleAPICallError):
+            return RETRYABLE if error.code in RETRYABLE_STATUS_CODES else FATAL
+        if isinstance(error, google_exceptions.RetryError):
+            return RETRYABLE
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return RETRYABLE
+
+    message = str(error).lower()
+    if 'api key not valid' in message:
+        return FATAL
+    # A leading status code decides; numbers elsewhere ("must be <= 65000") are not statuses
+    status = LEADING_STATUS_RE.match(message)
+    if status:
+        return RETRYABLE if int(status.group(1)) in RETRYABLE_STATUS_CODES else FATAL
+    if any(marker in message for marker in RETRYABLE_MESSAGES):
+        return RETRYABLE
+    return FATAL
+
+def backoff_delay(retry_number):
+    """Full-jitter exponential backoff: uniform between 0 and base * 2^retry, capped."""
+    ceiling = min(settings.UPSTREAM_BACKOFF_MAX, settings.UPSTREAM_BACKOFF_BASE * (2 ** retry_number))
+    return random.uniform(0, ceiling)
+
+class TokenBucket:
+    """
+    Process-wide rate limiter matched to the upstream API quota.
+
+    Holds up to `capacity` tokens, refilled at `rate_per_second`. Every upstream
+    call takes one token, waiting for a refill when the bucket is empty, so a
+    burst of requests queues here instead of piling onto a rate-limited API.
+    """
+
+    def __init__(self, rate_per_second, capacity):
+        self.rate_per_second = rate_per_second
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline):
+        """Take a token, waiting at most until the deadline."""
+        started = time.monotonic()
+        while True:
+            wait = self._take(deadline, started)
+            if not wait:
+                return
+            deadline.sleep(wait)
+
+    async def acquire_async(self, deadline):
+        """Take a token without blocking the event loop, waiting at most until the deadline."""
+        started = time.monotonic()
+        while True:
+            wait = self._take(deadline, started)
+            if not wait:
+                return
+            await deadline.sleep_async(wait)
+
+    def _take(self, deadline, started):
+        # Returns 0 once a token is taken, otherwise the seconds until one is available
+        if self.rate_per_second <= 0:
+            return 0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_second)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                RATE_LIMIT_WAIT_SECONDS.observe(now - started)
+                return 0
+            wait = (1 - self._tokens) / self.rate_per_second
+        if wait >= deadline.remaining():
+            raise TimeoutException("Deadline would pass while waiting for the upstream rate limit")
+        return wait
+
+class CircuitBreaker:
+    """
+    Fails fast while upstream is unhealthy.
+
+    After `failure_threshold` consecutive retryable failures the circuit opens
+    and calls raise UpstreamUnavailable for `reset_seconds`. Then one trial
+    call is let through: success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold, reset_seconds):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            elapsed = time.monotonic() - self._opened_at
+            if elapsed < self.reset_seconds or self._trial_in_flight:
+                raise UpstreamUnavailable(max(1, int(round(self.reset_seconds - elapsed))))
+            # Half-open: let a single trial call through
+            self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+            CIRCUIT_OPEN.set(0)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._trial_in_flight:
+                    logging.warning(f"Opening upstream circuit breaker after {self._failures} consecutive failures")
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+                CIRCUIT_OPEN.set(1)
+
+    def release_trial(self):
+        """Called when a trial call ended without telling us anything about upstream health."""
+        with self._lock:
+            self._trial_in_flight = False
+
+_rate_limiter = TokenBucket(settings.UPSTREAM_RATE_PER_MINUTE / 60.0, settings.UPSTREAM_BURST)
+_circuit_breaker = CircuitBreaker(settings.BREAKER_FAILURE_THRESHOLD, settings.BREAKER_RESET_SECONDS)
+
+def call_upstream(func, *args, deadline, **kwargs):
+    """
+    Makes one upstream call under the shared policy.
+
+    Every attempt passes the circuit breaker and takes a rate-limit token, and
+    runs within the request's deadline. Retryable errors are retried with
+    jittered exponential backoff, up to UPSTREAM_MAX_ATTEMPTS attempts and never
+    past the deadline; fatal errors are raised straight away.
+
+    Raises:
+        UpstreamUnavailable: the circuit breaker is open
+        TimeoutException / DeadlineCancelled: the deadline ran out or was cancelled
+        Exception: the last upstream error
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        _circuit_breaker.before_call()
+        try:
+            _rate_limiter.acquire(deadline)
+            result = deadline.run(func, *args, **kwargs)
+        except Exception as e:
+            deadline.sleep(_retry_delay(e, attempt, deadline))
+            continue
+        _circuit_breaker.record_success()
+        return result
+
+async def call_upstream_async(func, *args, deadline, **kwargs):
+    """
+    Async version of call_upstream for coroutine functions such as the SDK's
+    generate_content_async. Waits (rate limit, backoff, the call itself) never
+    block the event loop.
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        _circuit_breaker.before_call()
+        try:
+            await _rate_limiter.acquire_async(deadline)
+            result = await deadline.run_async(func(*args, **kwargs))
+        except Exception as e:
+            await deadline.sleep_async(_retry_delay(e, attempt, deadline))
+            continue
+        _circuit_breaker.record_success()
+        return result
+
+def _retry_delay(error, attempt, deadline):
+    """
+    Records a failed attempt with the circuit breaker and decides whether to retry.
+
+    Returns:
+        float: Seconds to back off before the next attempt; error is re-raised instead
+               if it is fatal, attempts are used up or the backoff would pass the deadline
+    """
+    if isinstance(error, (TimeoutException, DeadlineCancelled)) or classify_error(error) == FATAL:
+        _circuit_breaker.release_trial()
+        raise error
+    _circuit_breaker.record_failure()
+    if attempt >= settings.UPSTREAM_MAX_ATTEMPTS:
+        raise error
+    delay = backoff_delay(attempt - 1)
+    if delay >= deadline.remaining():
+        raise error
+    logging.warning(f"Upstream call failed, retrying in {delay:.1f}s ({attempt}/{settings.UPSTREAM_MAX_ATTEMPTS}): {error}")
+    RETRIES.inc()
+    return delay
@@ -80,11 +80,11 @@ document.addEventListener('DOMContentLoaded', () => {
             const controller = new AbortController();
             const timeoutId = setTimeout(() => controller.abort(), 600000); // 10 minute timeout
 
-            const response = await fetch('/analyze', {
+            const response = await fetch('/analyze/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
-                    'Accept': 'application/json'
+                    'Accept': 'text/event-stream'
                 },
                 body: JSON.stringify({
                     transcript: transcript,
@@ -99,98 +99,35 @@ document.addEventListener('DOMContentLoaded', () => {
                 throw error;
             });
 
-            // Clear the timeout
-            clearTimeout(timeoutId);
-
-            // Stop loading indicators regardless of response status
-            stopCarousel();
-            loadingIndicator.style.display = 'none';
-            
             // Check the content type of the response
             const contentType = response.headers.get('content-type');
-            if (!contentType || !contentType.includes('application/json')) {
-                throw new Error(`Expected JSON response but got ${contentType || 'unknown content type'}`);
-            }
-
             let data;
-            try {
-                data = await response.json();
-            } catch (jsonError) {
-                console.error("JSON parsing error:", jsonError);
-                throw new Error(`Failed to parse server response as JSON. Status: ${response.status}`);
-            }
-
-            if (!response.ok) {
-                const errorMessage = data && data.error ? data.error : `Server error: ${response.status}`;
-                showError(errorMessage);
-                return;
-            }
-
-            if (data.error) {
-                showError(data.error);
-            } else if (data.is_error) {
-                // Specific backend errors like NEED_SPEAKER_ROLES
-                showError(data.analysis_text); 
-            } else if (data.analysis_text) {
-                // Log the raw text before attempting to format it
-                console.log('Raw analysis text:\n', data.analysis_text);
-                
-                // Store raw text in a global variable or similar scope if needed elsewhere
-                window.rawAnalysisText = data.analysis_text; // Keep for potential debug button
-                
-                let formattedHtml = '';
+            if (contentType && contentType.includes('text/event-stream')) {
+                // Show the analysis text as it is generated; format it once complete
+                data = await readAnalysisStream(response);
+            } else if (contentType && contentType.includes('application/json')) {
+                // Validation errors come back as plain JSON before any streaming starts
                 try {
-                    // Attempt to create formatted HTML
-                    formattedHtml = enhanceTextFormatting(data.analysis_text);
-                } catch (formatError) {
-                    console.error("Error during text formatting:", formatError);
-                    // Optionally show a specific formatting error message, or just fall back to raw text
+                    data = await response.json();
+                } catch (jsonError) {
+                    console.error("JSON parsing error:", jsonError);
+                    throw new Error(`Failed to parse server response as JSON. Status: ${response.status}`);
                 }
-
-                // Use formatted HTML if successful, otherwise show raw text as fallback
-                if (formattedHtml && formattedHtml.trim() !== '') {
-                    analysisOutputPre.innerHTML = formattedHtml;
-                } else {
-                    // Fallback: Show raw text if formatting failed or returned empty
-                    console.warn("Formatting failed or returned empty. Displaying raw text.");
-                    analysisOutputPre.innerHTML = `<p style="color: orange; font-style: italic;">Could not format analysis. Displaying raw text:</p><pre style="white-space: pre-wrap; font-family: monospace; padding: 15px; background: #f8f9fa; border: 1px solid #e9ecef; border-radius: 4px; overflow-x: auto;">${data.analysis_text.replace(/</g, '&lt;').replace(/>/g, '&gt;')}</pre>`;
+                if (!response.ok) {
+                    data = { error: data && data.error ? data.error : `Server error: ${response.status}` };
                 }
+            } else {
+                throw new Error(`Expected an event stream but got ${contentType || 'unknown content type'}`);
+            }
 
-                // Add a debug button that might be useful for troubleshooting
-                const debugButton = document.createElement('button');
-                debugButton.textContent = 'Toggle Raw/Formatted View';
-                debugButton.style.marginTop = '20px';
-                debugButton.style.padding = '8px 12px';
-                debugButton.style.fontSize = '0.8em';
-                debugButton.style.backgroundColor = '#f0f0f0';
-                debugButton.style.border = '1px solid #ccc';
-                debugButton.style.borderRadius = '4px';
-                debugButton.style.cursor = 'pointer';
-                
-                debugButton.addEventListener('click', function() {
-                    if (this.dataset.showingRaw === 'true') {
-                        analysisOutputPre.innerHTML = formattedHtml;
-                        this.textContent = 'Show Raw Text';
-                        this.dataset.showingRaw = 'false';
-                    } else {
-                        // Show the raw text with line breaks preserved
-                        analysisOutputPre.innerHTML = `<pre style="white-space: pre-wrap; font-family: monospace; padding: 15px; background: #f8f9fa; border: 1px solid #e9ecef; border-radius: 4px; overflow-x: auto;">${window.rawAnalysisText.replace(/</g, '&lt;').replace(/>/g, '&gt;')}</pre>`;
-                        this.textContent = 'Show Formatted View';
-                        this.dataset.showingRaw = 'true';
-                    }
-                });
-                
-                // Add the debug button to the bottom of the results
-                analysisOutputPre.appendChild(debugButton);
+            // Clear the timeout
+            clearTimeout(timeoutId);
 
-                // ALWAYS show the results area if we got analysis_text
-                resultsArea.style.display = 'block'; 
-                resultsArea.scrollIntoView({ behavior: 'smooth' });
+            // Stop loading indicators regardless of response status
+            stopCarousel();
+            loadingIndicator.style.display = 'none';
 
-            } else {
-                // This case means response was OK, but no error and no analysis_text
-                showError('Received an empty analysis from the server.');
-            }
+            displayAnalysisResult(data);
         } catch (error) {
             // Stop loading indicators
             stopCarousel();
@@ -203,6 +140,130 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     });
 
+    // Reads the Server-Sent Events from /analyze/stream, rendering text as it arrives.
+    // Resolves with the final result, which has the same shape as the /analyze JSON response.
+    async function readAnalysisStream(response) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let streamedText = '';
+        let liveOutput = null;
+        let result = null;
+
+        while (result === null) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            // Events are separated by a blank line
+            let boundary;
+            while (result === null && (boundary = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let eventName = 'message';
+                const dataLines = [];
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                    else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+                });
+                if (dataLines.length === 0) continue;
+                const payload = JSON.parse(dataLines.join('\n'));
+
+                if (eventName === 'chunk') {
+                    if (!liveOutput) {
+                        // First text: swap the loading indicator for the live output
+                        stopCarousel();
+                        loadingIndicator.style.display = 'none';
+                        analysisOutputPre.innerHTML = '';
+                        liveOutput = document.createElement('pre');
+                        liveOutput.className = 'streaming-output';
+                        analysisOutputPre.appendChild(liveOutput);
+                        resultsArea.style.display = 'block';
+                    }
+                    streamedText += payload.text;
+                    liveOutput.textContent = streamedText;
+                } else if (eventName === 'done' || eventName === 'error') {
+                    result = payload;
+                }
+            }
+        }
+
+        if (result === null) {
+            throw new Error('The analysis stream ended before the analysis was complete.');
+        }
+        return result;
+    }
+
+    // Shows a completed analysis (or the error it produced) in the results area
+    function displayAnalysisResult(data) {
+        if (data.error) {
+            showError(data.error);
+        } else if (data.is_error) {
+            // Specific backend errors like NEED_SPEAKER_ROLES
+            showError(data.analysis_text); 
+        } else if (data.analysis_text) {
+            // Log the raw text before attempting to format it
+            console.log('Raw analysis text:\n', data.analysis_text);
+        
+            // Store raw text in a global variable or similar scope if needed elsewhere
+            window.rawAnalysisText = data.analysis_text; // Keep for potential debug button
+        
+            let formattedHtml = '';
+            try {
+                // Attempt to create formatted HTML
+                formattedHtml = enhanceTextFormatting(data.analysis_text);
+            } catch (formatError) {
+                console.error("Error during text formatting:", formatError);
+                // Optionally show a specific formatting error message, or just fall back to raw text
+            }
+
+            // Use formatted HTML if successful, otherwise show raw text as fallback
+            if (formattedHtml && formattedHtml.trim() !== '') {
+                analysisOutputPre.innerHTML = formattedHtml;
+            } else {
+                // Fallback: Show raw text if formatting failed or returned empty
+                console.warn("Formatting failed or returned empty. Displaying raw text.");
+                analysisOutputPre.innerHTML = `<p style="color: orange; font-style: italic;">Could not format analysis. Displaying raw text:</p><pre style="white-space: pre-wrap; font-family: monospace; padding: 15px; background: #f8f9fa; border: 1px solid #e9ecef; border-radius: 4px; overflow-x: auto;">${data.analysis_text.replace(/</g, '&lt;').replace(/>/g, '&gt;')}</pre>`;
+            }
+
+            // Add a debug button that might be useful for troubleshooting
+            const debugButton = document.createElement('button');
+            debugButton.textContent = 'Toggle Raw/Formatted View';
+            debugButton.style.marginTop = '20px';
+            debugButton.style.padding = '8px 12px';
+            debugButton.style.fontSize = '0.8em';
+            debugButton.style.backgroundColor = '#f0f0f0';
+            debugButton.style.border = '1px solid #ccc';
+            debugButton.style.borderRadius = '4px';
+            debugButton.style.cursor = 'pointer';
+        
+            debugButton.addEventListener('click', function() {
+                if (this.dataset.showingRaw === 'true') {
+                    analysisOutputPre.innerHTML = formattedHtml;
+                    this.textContent = 'Show Raw Text';
+                    this.dataset.showingRaw = 'false';
+                } else {
+                    // Show the raw text with line breaks preserved
+                    analysisOutputPre.innerHTML = `<pre style="white-space: pre-wrap; font-family: monospace; padding: 15px; background: #f8f9fa; border: 1px solid #e9ecef; border-radius: 4px; overflow-x: auto;">${window.rawAnalysisText.replace(/</g, '&lt;').replace(/>/g, '&gt;')}</pre>`;
+                    this.textContent = 'Show Formatted View';
+                    this.dataset.showingRaw = 'true';
+                }
+            });
+        
+            // Add the debug button to the bottom of the results
+            analysisOutputPre.appendChild(debugButton);
+
+            // ALWAYS show the results area if we got analysis_text
+            resultsArea.style.display = 'block'; 
+            resultsArea.scrollIntoView({ behavior: 'smooth' });
+
+        } else {
+            // This case means response was OK, but no error and no analysis_text
+            showError('Received an empty analysis from the server.');
+        }
+    }
+
     // Enhanced function to format the plain text output into structured HTML
     function enhanceTextFormatting(text) {
         let html = '';
@@ -0,0 +1,222 @@
+"""
+Load test for /analyze against a real gunicorn server using the offline stub backend.
+
+Starts gunicorn once per worker/thread configuration with LLM_BACKEND=stub,
+drives POST /analyze from a pool of client threads, and reports latency
+percentiles, throughput and the server's peak resident memory. No network
+access or API key is needed, so it can run in CI.
+
+Usage:
+    python benchmarks/load_test.py --configs 1x2,2x4 --requests 200 --concurrency 16
+    python benchmarks/load_test.py --configs 1x2 --max-p95 2.0 --json results.json
+    python benchmarks/load_test.py --server asgi --configs 1x1 --concurrency 200 --requests 1000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_TRANSCRIPT = """Alice: Thanks for making the time today. How do payments affect your company goals this year?
+Bob: Honestly, checkout failures are our biggest problem. We lose a lot of international orders.
+Alice: When did you first notice the drop in international conversion?
+Bob: About six months ago, after we launched in Brazil.
+Alice: Which payment methods do your Brazilian customers ask for most?
+Bob: Mostly Pix and local cards.
+Alice: If we added Pix, would that help you hit your conversion target?
+Bob: Yes, that would make a big difference.
+Alice: Is there anything else we should cover before we look at next steps?
+Bob: No, I think that's the main issue."""
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100.0 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+def process_tree(pid):
+    """Return pid and all of its descendants (Linux /proc only)."""
+    pids = [pid]
+    for child_pid in pids:
+        try:
+            with open(f'/proc/{child_pid}/task/{child_pid}/children') as f:
+                pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            continue
+    return pids
+
+def rss_bytes(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+class RssSampler(threading.Thread):
+    """Samples the total RSS of the gunicorn process tree until stopped."""
+
+    def __init__(self, pid, interval=0.1):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak_total = 0
+        self.peak_process = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            sizes = [rss_bytes(pid) for pid in process_tree(self.pid)]
+            self.peak_total = max(self.peak_total, sum(sizes))
+            self.peak_process = max([self.peak_process] + sizes)
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+def start_server(workers, threads, port, env_overrides, server_kind='wsgi'):
+    env = dict(os.environ)
+    env.update({
+        'LLM_BACKEND': 'stub',
+        'CACHE_MAX_ENTRIES': '0',  # Measure the service, not the result cache
+        'CACHE_DB_PATH': '',
+        'UPSTREAM_RATE_PER_MINUTE': '0',  # The stub has no quota to protect
+    })
+    env.update(env_overrides)
+    if server_kind == 'asgi':
+        # Threads are irrelevant for the async worker; concurrency comes from the event loop
+        command = [sys.executable, '-m', 'gunicorn', 'app.asgi:app', '-k', 'uvicorn.workers.UvicornWorker',
+                   '--workers', str(workers)]
+    else:
+        command = [sys.executable, '-m', 'gunicorn', 'run:app',
+                   '--workers', str(workers), '--threads', str(threads)]
+    command += ['--timeout', '600', '--preload', '--bind', f'127.0.0.1:{port}',
+                '--log-level', 'warning']
+    server = subprocess.Popen(command, cwd=REPO_ROOT, env=env)
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {server.returncode}")
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=1).read()
+            return server
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("gunicorn did not become ready within 30 seconds")
+
+def response_ok(response):
+    """True for a JSON answer without an error, or an event stream that ends with a done event."""
+    body = response.read()
+    if response.headers.get_content_type() == 'text/event-stream':
+        events = [line[len('event:'):].strip() for line in body.decode('utf-8').splitlines() if line.startswith('event:')]
+        return bool(events) and events[-1] == 'done'
+    return 'error' not in json.loads(body)
+
+def send_request(port, number, transcript, path):
+    body = json.dumps({
+        # Unique text per request so nothing is served from a cache
+        'transcript': f"{transcript}\nAlice: Request {number}.",
+        'sales_rep_names': 'Alice',
+        'merchant_names': 'Bob',
+    }).encode('utf-8')
+    request = urllib.request.Request(f'http://127.0.0.1:{port}{path}', data=body,
+                                     headers={'Content-Type': 'application/json'})
+    started = time.monotonic()
+    try:
+        with urllib.request.urlopen(request, timeout=600) as response:
+            ok = response_ok(response)
+    except (urllib.error.URLError, ConnectionError, OSError, ValueError):
+        ok = False
+    return time.monotonic() - started, ok
+
+def run_config(workers, threads, args, port):
+    env_overrides = {
+        'STUB_LATENCY': args.latency,
+        'STUB_ERROR_RATE': str(args.error_rate),
+        'STUB_SENTINEL_RATE': str(args.sentinel_rate),
+    }
+    server = start_server(workers, threads, port, env_overrides, args.server)
+    sampler = RssSampler(server.pid)
+    sampler.start()
+    try:
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(lambda number: send_request(port, number, args.transcript, args.path),
+                                    range(args.requests)))
+        elapsed = time.monotonic() - started
+    finally:
+        sampler.stop()
+        server.terminate()
+        server.wait(timeout=30)
+
+    latencies = [latency for latency, ok in results if ok]
+    return {
+        'config': f'{workers}x{threads}',
+        'server': args.server,
+        'workers': workers,
+        'threads': threads,
+        'requests': args.requests,
+        'errors': sum(1 for _, ok in results if not ok),
+        'rps': args.requests / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'peak_rss_mb': sampler.peak_total / (1024 * 1024),
+        'peak_process_rss_mb': sampler.peak_process / (1024 * 1024),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--configs', default='1x2', help='Comma-separated WORKERSxTHREADS list (render.yaml uses 1x2)')
+    parser.add_argument('--requests', type=int, default=100, help='Requests per configuration')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent client connections')
+    parser.add_argument('--latency', default='lognormal:-0.7,0.5', help='Stub latency distribution (see STUB_LATENCY)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of stub calls that fail')
+    parser.add_argument('--sentinel-rate', type=float, default=0.0, help='Fraction of stub calls answered with a sentinel')
+    parser.add_argument('--transcript-file', help='Transcript to send instead of the built-in sample')
+    parser.add_argument('--server', choices=['wsgi', 'asgi'], default='wsgi', help='Serve run:app (sync) or app.asgi:app (async)')
+    parser.add_argument('--path', default='/analyze', help='Endpoint to drive')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--json', dest='json_path', help='Also write the results to this file')
+    parser.add_argument('--max-p95', type=float, help='Exit non-zero if any configuration has a higher p95 (seconds)')
+    args = parser.parse_args()
+
+    args.transcript = SAMPLE_TRANSCRIPT
+    if args.transcript_file:
+        with open(args.transcript_file) as f:
+            args.transcript = f.read()
+
+    results = []
+    for offset, config in enumerate(args.configs.split(',')):
+        workers, threads = (int(part) for part in config.strip().lower().split('x'))
+        result = run_config(workers, threads, args, args.port + offset)
+        results.append(result)
+        print(f"{result['config']:>7}  {result['rps']:8.1f} req/s  "
+              f"p50 {result['p50']:6.3f}s  p95 {result['p95']:6.3f}s  p99 {result['p99']:6.3f}s  "
+              f"errors {result['errors']:4d}  peak RSS {result['peak_rss_mb']:7.1f} MB", flush=True)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.max_p95 is not None and any(result['p95'] > args.max_p95 for result in results):
+        print(f"p95 latency above {args.max_p95}s", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
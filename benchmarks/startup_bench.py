@@ -0,0 +1,154 @@
+"""
+Startup benchmark: import time, time to first request and per-worker unique memory.
+
+For each configuration this measures:
+  * import time - seconds to import the app (run.py) in a fresh interpreter
+  * ready       - seconds from launching gunicorn until GET / answers
+  * first       - seconds from launching gunicorn until the first POST /analyze answers
+  * USS / PSS   - unique and proportional memory of each worker after a few requests;
+                  USS is what every extra worker really costs
+
+By default the offline stub backend is used, so no API key or network is
+needed. --backend gemini uses the real backend with a dummy key instead:
+warm-up (or the first request) then loads google.generativeai, and each
+analysis makes one upstream call that fails (after at most 5 seconds without
+network access), so the SDK's effect on startup time and on shared memory shows up.
+
+Usage:
+    python benchmarks/startup_bench.py --workers 1,4
+    python benchmarks/startup_bench.py --workers 4 --backend gemini --json startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import SAMPLE_TRANSCRIPT, process_tree  # noqa: E402
+
+def memory_rollup(pid):
+    """Return (uss, pss) in bytes for a process, from /proc/<pid>/smaps_rollup (Linux only)."""
+    values = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 3 and parts[2] == 'kB':
+                    values[parts[0].rstrip(':')] = int(parts[1]) * 1024
+    except OSError:
+        return 0, 0
+    return values.get('Private_Clean', 0) + values.get('Private_Dirty', 0), values.get('Pss', 0)
+
+def measure_import(env, runs):
+    """Median seconds to import run.py in a fresh interpreter."""
+    code = 'import time; started = time.perf_counter(); import run; print(time.perf_counter() - started)'
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', code], cwd=REPO_ROOT, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return sorted(timings)[len(timings) // 2]
+
+def wait_for(url, server, started, data=None, limit=60):
+    request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'} if data else {})
+    while time.monotonic() - started < limit:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {server.returncode}")
+        try:
+            urllib.request.urlopen(request, timeout=30).read()
+            return time.monotonic() - started
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.02)
+    raise RuntimeError(f"{url} did not answer within {limit} seconds")
+
+def run_config(workers, warmup, args, port):
+    env = dict(os.environ)
+    env.update({
+        'LLM_BACKEND': args.backend,
+        'STUB_LATENCY': 'fixed:0',
+        'CACHE_MAX_ENTRIES': '0',
+        'CACHE_DB_PATH': '',
+        'WARMUP_ON_START': 'true' if warmup else 'false',
+    })
+    if args.backend == 'gemini':
+        # Dummy key: calls fail instead of being retried, so requests stay short
+        env.update({'GEMINI_API_KEY': 'startup-bench', 'UPSTREAM_MAX_ATTEMPTS': '1', 'ANALYSIS_TIMEOUT_SECONDS': '5'})
+    import_seconds = measure_import(env, args.runs)
+
+    app_target = 'app.asgi:app' if args.server == 'asgi' else 'run:app'
+    command = [sys.executable, '-m', 'gunicorn', app_target, '--workers', str(workers),
+               '--bind', f'127.0.0.1:{port}', '--log-level', 'warning']
+    if args.server == 'asgi':
+        command += ['-k', 'uvicorn.workers.UvicornWorker']
+
+    body = json.dumps({'transcript': SAMPLE_TRANSCRIPT, 'sales_rep_names': 'Alice', 'merchant_names': 'Bob'}).encode()
+    started = time.monotonic()
+    server = subprocess.Popen(command, cwd=REPO_ROOT, env=env)
+    try:
+        ready = wait_for(f'http://127.0.0.1:{port}/', server, started)
+        first = wait_for(f'http://127.0.0.1:{port}/analyze', server, started, data=body)
+        # Let every worker serve some requests before measuring its memory
+        with ThreadPoolExecutor(max_workers=workers * 2) as pool:
+            list(pool.map(lambda _: wait_for(f'http://127.0.0.1:{port}/analyze', server, time.monotonic(), data=body),
+                          range(workers * 10)))
+        worker_pids = [pid for pid in process_tree(server.pid) if pid != server.pid]
+        memory = [memory_rollup(pid) for pid in worker_pids]
+        master_uss, master_pss = memory_rollup(server.pid)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    mb = 1024 * 1024
+    return {
+        'server': args.server,
+        'workers': workers,
+        'warmup': warmup,
+        'backend': args.backend,
+        'import_seconds': import_seconds,
+        'ready_seconds': ready,
+        'first_request_seconds': first,
+        'master_uss_mb': master_uss / mb,
+        'worker_uss_mb': [uss / mb for uss, _ in memory],
+        'worker_pss_mb': [pss / mb for _, pss in memory],
+        'total_pss_mb': (master_pss + sum(pss for _, pss in memory)) / mb,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default='1', help='Comma-separated worker counts')
+    parser.add_argument('--warmup', choices=['off', 'on', 'both'], default='both', help='WARMUP_ON_START setting(s) to measure')
+    parser.add_argument('--backend', choices=['stub', 'gemini'], default='stub', help='LLM backend (gemini uses a dummy key)')
+    parser.add_argument('--server', choices=['wsgi', 'asgi'], default='wsgi')
+    parser.add_argument('--runs', type=int, default=3, help='Import-time runs per configuration (median is reported)')
+    parser.add_argument('--port', type=int, default=5065)
+    parser.add_argument('--json', dest='json_path', help='Also write the results to this file')
+    args = parser.parse_args()
+
+    warmups = {'off': [False], 'on': [True], 'both': [False, True]}[args.warmup]
+    results = []
+    offset = 0
+    for workers in (int(count) for count in args.workers.split(',')):
+        for warmup in warmups:
+            result = run_config(workers, warmup, args, args.port + offset)
+            offset += 1
+            results.append(result)
+            uss = result['worker_uss_mb']
+            print(f"{result['server']} {result['backend']} workers {workers}  warm-up {'on ' if warmup else 'off'}  "
+                  f"import {result['import_seconds']:.3f}s  ready {result['ready_seconds']:.3f}s  "
+                  f"first request {result['first_request_seconds']:.3f}s  "
+                  f"worker USS {min(uss):.1f}-{max(uss):.1f} MB  total PSS {result['total_pss_mb']:.1f} MB", flush=True)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
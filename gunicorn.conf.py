@@ -0,0 +1,42 @@
+"""
+Gunicorn settings, loaded automatically from the working directory.
+
+With preload_app the app is imported once in the master and the workers are
+forked from it, so they share its memory pages copy-on-write. CPython's
+cyclic garbage collector would write to every tracked object it scans,
+copying those shared pages into each worker, so collection is disabled while
+the app loads and everything loaded so far is moved to the permanent
+generation with gc.freeze() before each fork. Workers then collect normally.
+
+Async job mode keeps its jobs in one process's memory, so it is turned off in
+every worker when there is more than one. Gauges such as the in-flight count
+are summed over live workers only, so a worker's metric files are marked dead
+when it exits.
+
+Command-line flags (e.g. in render.yaml) override these values.
+"""
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5001')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '1'))
+threads = int(os.environ.get('GUNICORN_THREADS', '2'))
+timeout = 600
+preload_app = True
+
+# The master only loads the app and forks; no collections until the first fork
+gc.disable()
+
+def pre_fork(server, worker):
+    gc.freeze()
+
+def post_fork(server, worker):
+    gc.enable()
+    if server.cfg.workers > 1:
+        from app.services.job_queue import disable_job_mode
+        disable_job_mode()
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
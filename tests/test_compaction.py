@@ -0,0 +1,39 @@
+from app.services.compaction import compact_transcript
+
+REP_QUESTION = ("So tell me a little more about how your checkout failures affect the goals "
+                "your team has set for this year and what that means for you?")
+MONOLOGUE = ' '.join(f"word{number}" for number in range(300))
+
+def test_unmatched_rep_label_is_kept_word_for_word():
+    transcript = f"Rep: {REP_QUESTION}\nCustomer: Yeah.\nCustomer: {MONOLOGUE}"
+    text, shortened = compact_transcript(transcript, 'Dan', 'Customer', 200)
+    assert shortened
+    assert f"Rep: {REP_QUESTION}" in text
+    assert "Customer: Yeah." in text
+    assert '[…]' in text.split('\n')[-1]
+
+def test_near_miss_rep_name_is_kept_word_for_word():
+    transcript = f"Dan: {REP_QUESTION}\nBob: Yeah.\nBob: {MONOLOGUE}"
+    text, _ = compact_transcript(transcript, 'Daniel', 'Bob', 200)
+    assert f"Dan: {REP_QUESTION}" in text
+    assert "Bob: Yeah." in text
+
+def test_unmatched_speakers_are_not_merged_or_dropped():
+    transcript = "Agent: Hello there.\nAgent: Okay.\nBob: Hi.\nBob: Mm-hm."
+    text, _ = compact_transcript(transcript, 'Alice', 'Bob')
+    assert text == "Agent: Hello there.\nAgent: Okay.\nBob: Hi."
+
+def test_merchant_backchannel_answering_a_question_is_kept():
+    transcript = "Alice: Shall we book a demo?\nBob: Yeah.\nAlice: Great.\nBob: Mm-hm."
+    text, _ = compact_transcript(transcript, 'Alice', 'Bob')
+    assert text == "Alice: Shall we book a demo?\nBob: Yeah.\nAlice: Great."
+
+def test_unbracketed_timestamps_are_stripped():
+    transcript = "00:00:01 Alice: How do payments affect your goals?\n00:05 Bob: They slow us down.\n00:09 Alice: Why?"
+    text, _ = compact_transcript(transcript, 'Alice', 'Bob')
+    assert text == "Alice: How do payments affect your goals?\nBob: They slow us down.\nAlice: Why?"
+
+def test_bracketed_timestamps_are_stripped():
+    transcript = "[00:00:01] Alice: Hi?\n[00:00:04]Bob: Hello."
+    text, _ = compact_transcript(transcript, 'Alice', 'Bob')
+    assert text == "Alice: Hi?\nBob: Hello."
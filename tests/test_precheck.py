@@ -0,0 +1,41 @@
+import pytest
+
+from app.services.precheck import precheck_transcript
+from app.services.prompts import NEED_SPEAKER_ROLES_RESPONSE, DATA_NOT_REDACTED_RESPONSE, UNSUPPORTED_INPUT_RESPONSE
+
+CALL = "Alice: How do payments affect your goals?\nBob: Checkout failures cost us sales.\n"
+
+def test_unbracketed_timestamps_before_speakers_pass():
+    transcript = "00:00:01 Alice: How do payments affect your goals?\n00:00:05 Bob: They slow us down."
+    assert precheck_transcript(transcript, 'Alice', 'Bob') is None
+
+def test_bracketed_timestamps_before_speakers_pass():
+    transcript = "[00:00:01] Alice: How do payments affect your goals?\n[00:05] Bob: They slow us down."
+    assert precheck_transcript(transcript, 'Alice', 'Bob') is None
+
+def test_prose_is_unsupported():
+    assert precheck_transcript("Please score this call for me.", 'Alice', 'Bob') == UNSUPPORTED_INPUT_RESPONSE
+
+@pytest.mark.parametrize('line', [
+    "Bob: we grew 2021-2022-2023 steadily",
+    "Bob: order ref 2024-0001-5532",
+    "Bob: about 10-15-20-25-30 percent",
+])
+def test_numbers_that_are_not_phone_numbers_pass(line):
+    assert precheck_transcript(CALL + line, 'Alice', 'Bob') is None
+
+@pytest.mark.parametrize('line', [
+    "Bob: call me on 555-123-4567",
+    "Bob: call me on +44 20 7946 0958",
+    "Bob: my card is 4111 1111 1111 1111",
+    "Bob: email bob@example.com",
+])
+def test_personal_data_is_flagged(line):
+    assert precheck_transcript(CALL + line, 'Alice', 'Bob') == DATA_NOT_REDACTED_RESPONSE
+
+def test_unmatched_names_are_left_to_the_model():
+    assert precheck_transcript("Dan: Hi?\nBob: Hello.", 'Daniel', 'Bob') is None
+    assert precheck_transcript("Rep: Hi?\nCustomer: Hello.", 'Alice', 'Bob') is None
+
+def test_speaker_matching_both_roles_is_flagged():
+    assert precheck_transcript(CALL, 'Alice', 'Alice') == NEED_SPEAKER_ROLES_RESPONSE
@@ -0,0 +1,36 @@
+import sqlite3
+
+from app.services.result_cache import AnalysisCache
+
+RESULT = {'analysis_text': 'Score: 4/5', 'model': 'gemini', 'attempt': 1}
+
+def test_hits_add_up_the_saved_time_and_tokens():
+    cache = AnalysisCache(max_entries=4)
+    cache.put('key', RESULT, 2.5, 1200, 300)
+    assert cache.get('key') == RESULT
+    assert cache.get('key') == RESULT
+    stats = cache.stats()
+    assert stats['memory_hits'] == 2
+    assert stats['saved_seconds'] == 5.0
+    assert (stats['saved_prompt_tokens'], stats['saved_output_tokens']) == (2400, 600)
+
+def test_disk_hits_keep_the_token_counts(tmp_path):
+    db_path = str(tmp_path / 'cache.db')
+    AnalysisCache(max_entries=0, db_path=db_path).put('key', RESULT, 1.0, 800, 200)
+    cache = AnalysisCache(max_entries=0, db_path=db_path)
+    assert cache.get('key') == RESULT
+    stats = cache.stats()
+    assert stats['disk_hits'] == 1
+    assert (stats['saved_prompt_tokens'], stats['saved_output_tokens']) == (800, 200)
+
+def test_database_without_token_columns_is_upgraded(tmp_path):
+    db_path = str(tmp_path / 'cache.db')
+    db = sqlite3.connect(db_path)
+    db.execute('CREATE TABLE analysis_cache ('
+               'key TEXT PRIMARY KEY, result TEXT NOT NULL, elapsed REAL NOT NULL, created_at REAL NOT NULL)')
+    db.commit()
+    db.close()
+    cache = AnalysisCache(max_entries=0, db_path=db_path)
+    cache.put('key', RESULT, 1.0, 800, 200)
+    assert cache.get('key') == RESULT
+    assert cache.stats()['saved_prompt_tokens'] == 800
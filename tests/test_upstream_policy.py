@@ -0,0 +1,19 @@
+import pytest
+
+from app.services.upstream_policy import classify_error, RETRYABLE, FATAL
+
+@pytest.mark.parametrize('message, expected', [
+    ('429 Resource has been exhausted (e.g. check quota).', RETRYABLE),
+    ('503 The service is currently unavailable.', RETRYABLE),
+    ('500 An internal error has occurred.', RETRYABLE),
+    ('400 Request payload size must be <= 65000 bytes', FATAL),
+    ('400 Invalid argument: max_output_tokens 5000 is too large', FATAL),
+    ('404 Model 503-preview not found', FATAL),
+    ('Deadline Exceeded', RETRYABLE),
+    ('Response blocked for safety reasons', FATAL),
+])
+def test_classify_error_messages(message, expected):
+    assert classify_error(ValueError(message)) == expected
+
+def test_connection_errors_are_retryable():
+    assert classify_error(ConnectionResetError('reset by peer')) == RETRYABLE